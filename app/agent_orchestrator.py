@@ -1,13 +1,11 @@
 #app/agent_orchestrator.py
 
 import time
-import torch
 from importlib import import_module
 from googletrans import Translator
-from sentence_transformers import SentenceTransformer, util
 
 from app.knowledge_graph import update_user_profile, build_context_prompt
-from app.rag_engine import retrieve, format_rag_context
+from app.rag_engine import retrieve, format_rag_context, shares_turn_embedding
 from app.llama_agent import ask_llama
 from app.lang_detect import detect_language
 from app.task_flow import get_task_stage, get_next_stage
@@ -19,12 +17,12 @@ from app.utils.session_memory import (
     update_user_context, get_user_context, is_session_expired
 )
 from app.utils.context_followup import is_contextual_followup, get_contextual_prompt
-from app.utils.domain_detector import detect_domain
-from app.intents.intent_classifier import classify_intent
+from app.utils.phrase_bank import phrase_bank
+from app.utils.turn_analysis import TurnAnalysis
+from app.utils.intent_logger import log_labelled_turn
 import app.utils.user_graph as user_graph
 
 translator = Translator()
-embedding_model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
 
 DOMAIN_MODULES = {
     "food": import_module("app.domains.food_agent"),
@@ -36,17 +34,12 @@ RESET_PHRASES = [
     "mulai ulang", "reset sesi", "mulai dari awal", "hapus percakapan", "start over",
     "restart session", "clear chat", "reset everything", "ulang dari awal", "reset percakapan"
 ]
-RESET_EMBEDDINGS = embedding_model.encode(RESET_PHRASES, convert_to_tensor=True)
+phrase_bank.register("reset", {"reset": RESET_PHRASES})
 
 
 def personalize_response(user_id: str, lang: str, domain: str) -> str:
-    prefs = get_user_preference_tags(user_id)
-    if not prefs:
-        return ""
-
-    matched_prefs = [
-        pref for pref in prefs if detect_domain(pref, threshold=0.55, top_k=1) == domain
-    ]
+    # Domains are assigned when a preference is stored, so this is a single lookup
+    matched_prefs = get_user_preference_tags(user_id, domain=domain)
 
     if matched_prefs:
         joined = ", ".join(matched_prefs)
@@ -61,11 +54,11 @@ def run_orchestrated_agent(message: str, user_id: str = "anonymous_user", mode:
     if not message.strip():
         return "❗ Please enter valid message."
 
+    analysis = TurnAnalysis(message, mode)
+
     # Reset by user input
-    input_vec = embedding_model.encode(message, convert_to_tensor=True)
-    scores = util.cos_sim(input_vec, RESET_EMBEDDINGS)[0]
-    if torch.max(scores).item() > 0.75:
-        lang = detect_language(message)
+    if analysis.phrase_scores["reset"]["reset"] > 0.75:
+        lang = analysis.lang
         clear_session(user_id)
         return {
             "id": "🔄 Sesi kamu sudah direset. Yuk mulai dari awal!",
@@ -79,8 +72,8 @@ def run_orchestrated_agent(message: str, user_id: str = "anonymous_user", mode:
     prev_lang = session_ctx.get("lang")
     prev_domain = session_ctx.get("domain")
 
-    lang = prev_lang or detect_language(message)
-    domain = prev_domain or detect_domain(message)
+    lang = prev_lang or analysis.lang
+    domain = prev_domain or analysis.domain
 
     print(f"[Orchestrator] Domain detected: {domain}")
 
@@ -90,7 +83,7 @@ def run_orchestrated_agent(message: str, user_id: str = "anonymous_user", mode:
     update_user_context(user_id, {"lang": lang, "domain": domain})
     update_user_profile(user_id, message)
 
-    guessed_intent = classify_intent(message)
+    guessed_intent = analysis.intent
     if domain == "general" and guessed_intent:
         if any(kw in guessed_intent for kw in ["order", "food"]):
             domain = "food"
@@ -101,34 +94,38 @@ def run_orchestrated_agent(message: str, user_id: str = "anonymous_user", mode:
 
     handler = DOMAIN_MODULES.get(domain)
     if not handler:
-        return default_fallback(message)
+        return default_fallback(message, analysis.lang)
 
-    if is_contextual_followup(message, user_id, mode):
+    if is_contextual_followup(message, user_id, mode, analysis=analysis):
         contextual_prompt = get_contextual_prompt(user_id)
-        response = ask_llama(f"{contextual_prompt}\nUser: {message}\nAssistant:")
-        return format_final_response(response, lang, user_id, domain, message)
+        response = ask_llama(f"{contextual_prompt}\nUser: {message}\nAssistant:", personal=True)
+        return format_final_response(response, lang, user_id, domain, message, analysis)
 
-    final_prompt = build_llm_prompt(message, user_id, domain)
- 
-    response = ask_llama(final_prompt)
- 
-    detected_intent = classify_intent(message, mode=mode)
+    detected_intent = analysis.intent
     slots = handler.slots.extract_slots(detected_intent, message) if detected_intent else {}
 
+    # "sushi di Menteng": restrict retrieval to documents located there
+    query_vec = analysis.embedding if shares_turn_embedding() else None
+    final_prompt = build_llm_prompt(message, user_id, domain, query_vec, filters={"location": slots.get("location")})
+ 
+    # The prompt carries the user's preferences and recent searches, so it is never cached
+    response = ask_llama(final_prompt, personal=True)
+
     if detected_intent:
         remember_intent(user_id, detected_intent, slots)
+        log_labelled_turn(message, detected_intent)
         if hasattr(handler, "handle"):
-            return handler.handle(detected_intent, slots, user_id)
+            return handler.handle(detected_intent, slots, user_id, analysis=analysis)
 
     if not detected_intent:
         print("[Intent] Tidak ada intent jelas. Gunakan external search.")
-        external_info = enrich_with_external_search(message)
-        return format_final_response("🔍 Let me find the answer for you..." + external_info, lang, user_id, domain, message)
+        external_info = enrich_with_external_search(message, analysis.lang)
+        return format_final_response("🔍 Let me find the answer for you..." + external_info, lang, user_id, domain, message, analysis)
 
     if any(kw in response.lower() for kw in ["maaf", "tidak paham", "sorry", "don't understand"]):
         if hasattr(handler, "fallback"):
-            return handler.fallback.fallback(message)
-        return default_fallback(message)
+            return handler.fallback.fallback(message, analysis.lang)
+        return default_fallback(message, analysis.lang)
 
     try:
         if detect_language(response) != lang:
@@ -136,17 +133,17 @@ def run_orchestrated_agent(message: str, user_id: str = "anonymous_user", mode:
     except Exception as e:
         print("[Translation] Error:", e)
 
-    return format_final_response(response, lang, user_id, domain, message)
+    return format_final_response(response, lang, user_id, domain, message, analysis)
 
 
-def format_final_response(response: str, lang: str, user_id: str, domain: str, message: str) -> str:
+def format_final_response(response: str, lang: str, user_id: str, domain: str, message: str, analysis: TurnAnalysis = None) -> str:
     tone = {
         "id": "✨ Ini yang bisa saya bantu:",
         "en": "✨ Here's something that might help:"
     }.get(lang, "✅ Here's what I found:")
 
     personalization = personalize_response(user_id, lang, domain)
-    stage = get_task_stage(message)
+    stage = analysis.stage if analysis else get_task_stage(message)
     dynamic_closing = get_next_stage(stage, domain, lang)
 
     response = response.strip()
@@ -173,15 +170,15 @@ def enrich_with_external_search_original(query: str) -> str:
     return f"\n\n🔍 Extra info:\n{tavily_result}\n{serpapi_result}".strip()
 
 
-def default_fallback(message: str) -> str:
-    lang = detect_language(message)
+def default_fallback(message: str, lang: str = None) -> str:
+    lang = lang or detect_language(message)
     return (
         "Maaf, saya belum yakin dengan maksud Anda. Bisa dijelaskan lagi?"
         if lang == "id"
         else "Sorry, I'm not sure what you meant. Could you please clarify?"
     )
 
-def enrich_with_external_search(query: str) -> str:
+def enrich_with_external_search(query: str, lang: str = None) -> str:
  
     tavily_result = use_tavily(query)
     serpapi_result = use_serpapi_search(query)
@@ -196,7 +193,7 @@ def enrich_with_external_search(query: str) -> str:
     if serpapi_result:
         combined_results += f"SERP:\n{serpapi_result.strip()}\n"
 
-     reformulation_prompt = (
+    reformulation_prompt = (
         f"You are a helpful assistant. A user asked a question and external sources returned raw information.\n"
         f"Your task is to rewrite and summarize the information into a clear, relevant, and natural-sounding response to the user's question.\n\n"
         f"User question: {query}\n\n"
@@ -204,16 +201,16 @@ def enrich_with_external_search(query: str) -> str:
         f"Write a helpful, concise response to the user using only what's relevant from the info above."
     )
 
-    refined_response = ask_llama(reformulation_prompt).strip()
+    refined_response = ask_llama(reformulation_prompt, site="web_summary", semantic_key=query, scope=f"external:{lang or detect_language(query)}").strip()
     if not refined_response or "no useful" in refined_response.lower():
         return ""
 
     return f"\n\n🔍 Extra info:\n{refined_response}"
 
 
-def build_llm_prompt(message: str, user_id: str, domain: str) -> str:
+def build_llm_prompt(message: str, user_id: str, domain: str, query_vec=None, filters=None) -> str:
     context_kg = build_context_prompt(user_id)
-    rag_context = format_rag_context(retrieve(message, domain, user_id), domain.upper())
+    rag_context = format_rag_context(retrieve(message, domain, user_id, query_vec, filters), domain.upper())
     prefs = get_user_preference_tags(user_id)
     searches = user_graph.get_recent_searches(user_id)
     lang = user_graph.get_user_language(user_id)
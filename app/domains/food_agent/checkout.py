@@ -49,13 +49,13 @@ def build_order_cards(orders: list, lang: str) -> list:
         cards.append(card)
     return cards
 
-def handle(intent: str, slots: Dict[str, Union[str, list]], user_id: str) -> Union[str, Dict[str, object]]:
+def handle(intent: str, slots: Dict[str, Union[str, list]], user_id: str, analysis=None) -> Union[str, Dict[str, object]]:
     orders = slots.get("orders", []) or get_user_orders(user_id)
     delivery_time = slots.get("delivery_time", "")
     location = slots.get("location", "")
 
     sample_ref = orders[0]["item"] if orders else (location or "makanan")
-    lang = detect_language(sample_ref)
+    lang = analysis.lang if analysis else detect_language(sample_ref)
 
     if intent == "confirm_order":
         return {
@@ -107,7 +107,7 @@ Return only method names (no description), like:
 2. Paypal
 3. Credit Card
 """
-        methods = ask_llama(prompt)
+        methods = ask_llama(prompt, site="payment_methods", semantic_key="payment methods")
 
         return {
             "text": {
@@ -144,7 +144,7 @@ Estimate the total price in IDR. Use reasonable average prices for each item. Re
 
 Total: Rp[amount]
 """
-        price_info = ask_llama(prompt)
+        price_info = ask_llama(prompt, site="order_total")
 
         return {
             "text": {
@@ -179,7 +179,7 @@ Based on this info:
 
 Respond with a clear ETA in minutes or range. Example: '25–40 minutes'
 """
-        eta = ask_llama(prompt)
+        eta = ask_llama(prompt, site="delivery_eta")
 
         return {
             "text": {
@@ -19,9 +19,9 @@ suggestions = {
     ]
 }
 
-def fallback(message: str) -> str:
+def fallback(message: str, lang: str = None) -> str:
     """Fallback suggestion for food queries if LLM fails to respond confidently"""
-    lang = detect_language(message)
+    lang = lang or detect_language(message)
 
     # Intro message per language
     intro = {
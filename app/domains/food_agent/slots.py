@@ -5,7 +5,8 @@ import re
 from typing import Dict, List
 from difflib import get_close_matches
 import spacy
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
+from app.utils.embedding_cache import cached_encode
 
 # Load spaCy multilingual model
 try:
@@ -14,9 +15,6 @@ except Exception as e:
     print(f"spaCy load failed: {e}")
     nlp = None
 
-# Load multilingual embedding model
-embedding_model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-
 # Patterns
 QUANTITY_ITEM_PATTERN = r"(?:(\d{1,2})\s*(?:x|porsi|pcs|buah|gelas|mangkuk|kotak|bungkus|plates|units)?\s*)?([\w\s\-]+?)(?=(?:dan|,|&|$))"
 TIME_PATTERN = r"(?:jam|pukul|at|sekitar|around)?\s*(\d{1,2})([:.]?(\d{2}))?\s*(pagi|siang|sore|malam|am|pm)?"
@@ -111,12 +109,16 @@ def extract_with_spacy(message: str) -> Dict[str, List[str]]:
 
     return entities
 
+def cos_sim(vector: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    matrix = matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+    return matrix @ (vector / max(np.linalg.norm(vector), 1e-12))
+
 def is_food_like(text: str, reference_foods: List[str], threshold: float = 0.55) -> bool:
     try:
-        emb_input = embedding_model.encode(text, convert_to_tensor=True)
-        emb_ref = embedding_model.encode(reference_foods, convert_to_tensor=True)
-        sim_scores = util.cos_sim(emb_input, emb_ref)[0]
-        best_score = sim_scores.max().item()
+        emb_input = cached_encode(text)
+        emb_ref = cached_encode(reference_foods)
+        sim_scores = cos_sim(emb_input, emb_ref)
+        best_score = float(sim_scores.max())
         return best_score >= threshold
     except Exception as e:
         return False
@@ -127,10 +129,10 @@ def match_food_item(fragment: str, reference_items: List[str] = None) -> str:
         return fragment
 
     try:
-        emb_input = embedding_model.encode(fragment, convert_to_tensor=True)
-        emb_list = embedding_model.encode(reference_items, convert_to_tensor=True)
-        scores = util.cos_sim(emb_input, emb_list)[0]
-        best_idx = scores.argmax().item()
+        emb_input = cached_encode(fragment)
+        emb_list = cached_encode(reference_items)
+        scores = cos_sim(emb_input, emb_list)
+        best_idx = int(scores.argmax())
         return reference_items[best_idx]
     except Exception as e:
         return fragment
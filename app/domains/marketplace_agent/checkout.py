@@ -8,9 +8,9 @@ from app.llama_agent import ask_llama
 def can_handle(intent: str) -> bool:
     return intent in ["buy_product", "sell_product", "search_deals"]
 
-def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str:
+def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str, analysis=None) -> str:
     ref_text = slots.get("product") or slots.get("category") or "produk"
-    lang = detect_language(ref_text)
+    lang = analysis.lang if analysis else detect_language(ref_text)
 
     if intent == "buy_product":
         product = slots.get("product")
@@ -29,7 +29,7 @@ def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str
                 "en": f"Summarize search results and recommend the best online store to buy {product}:\n\n{results}",
             }.get(lang)
 
-            summary = ask_llama(prompt)
+            summary = ask_llama(prompt, site="web_summary", semantic_key=product, scope=f"buy:{lang}")
             return {
                 "id": f"🛒 Berikut rekomendasi pembelian untuk {product}:\n\n{summary}",
                 "en": f"🛒 Here's a recommendation for buying {product}:\n\n{summary}",
@@ -47,7 +47,7 @@ def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str
                 "id": f"Buat deskripsi singkat dan menarik untuk menjual produk {item} di marketplace.",
                 "en": f"Create a short and compelling description for selling {item} on a marketplace.",
             }.get(lang)
-            listing_desc = ask_llama(prompt)
+            listing_desc = ask_llama(prompt, site="listing_description", semantic_key=item, scope=lang)
 
             return {
                 "id": f"📤 Barang {item} Anda telah dicantumkan di marketplace dengan deskripsi:\n\n{listing_desc}",
@@ -76,7 +76,7 @@ def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str
                 "en": f"Summarize search results for deals in category {category}:\n\n{results}",
             }.get(lang)
 
-            summary = ask_llama(prompt)
+            summary = ask_llama(prompt, site="web_summary", semantic_key=category, scope=f"deals:{lang}")
             return {
                 "id": f"🔥 Promo terbaik minggu ini untuk kategori {category}:\n\n{summary}",
                 "en": f"🔥 This week's best deals for category {category}:\n\n{summary}",
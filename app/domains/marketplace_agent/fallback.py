@@ -19,9 +19,9 @@ examples = {
     ]
 }
 
-def fallback(message: str) -> str:
+def fallback(message: str, lang: str = None) -> str:
     """Generate fallback marketplace assistant response based on language"""
-    lang = detect_language(message)
+    lang = lang or detect_language(message)
 
     intro = {
         "en": "🛍️ I'm your shopping assistant! Ask me about products, deals, or categories.\n",
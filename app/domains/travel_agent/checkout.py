@@ -8,8 +8,8 @@ from app.llama_agent import ask_llama
 def can_handle(intent: str) -> bool:
     return intent in ["book_flight", "book_hotel", "plan_trip","find_attractions"]
 
-def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str:
-    lang = detect_language(
+def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str, analysis=None) -> str:
+    lang = analysis.lang if analysis else detect_language(
         slots.get("destination") or
         slots.get("location") or
         slots.get("to") or
@@ -46,7 +46,7 @@ def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str
                 "en": f"Here's a hotel search result in {location}. Summarize and highlight top hotel options:\n\n{results}",
             }.get(lang)
 
-            llm_response = ask_llama(prompt)
+            llm_response = ask_llama(prompt, site="web_summary", semantic_key=location, scope=f"hotels:{lang}")
             return {
                 "id": f"🏨 Ini beberapa rekomendasi hotel di {location}:\n\n{llm_response}",
                 "en": f"🏨 Here are some hotel recommendations in {location}:\n\n{llm_response}",
@@ -74,7 +74,7 @@ def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str
                 "en": f"Create a 3-day travel itinerary for {destination} based on this info:\n\n{results}",
             }.get(lang)
 
-            llm_response = ask_llama(prompt)
+            llm_response = ask_llama(prompt, site="web_summary", semantic_key=destination, scope=f"itinerary:{lang}")
             return {
                 "id": f"🗺️ Berikut itinerary ke {destination} yang bisa Anda ikuti:\n\n{llm_response}",
                 "en": f"🗺️ Here's a travel itinerary for {destination} you can follow:\n\n{llm_response}",
@@ -102,7 +102,7 @@ def handle(intent: str, slots: Dict[str, Union[str, dict]], user_id: str) -> str
                 "en": f"Here's a search result for attractions in {location}. Summarize and highlight interesting spots:\n\n{results}",
             }.get(lang)
 
-            llm_response = ask_llama(prompt)
+            llm_response = ask_llama(prompt, site="web_summary", semantic_key=location, scope=f"attractions:{lang}")
             return {
                 "id": f"📸 Ini beberapa tempat wisata yang bisa Anda kunjungi di {location}:\n\n{llm_response}",
                 "en": f"📸 Here are some tourist spots you can visit in {location}:\n\n{llm_response}",
@@ -19,9 +19,9 @@ examples = {
     ]
 }
 
-def fallback(message: str) -> str:
+def fallback(message: str, lang: str = None) -> str:
     """Generate fallback travel assistant response based on user's language"""
-    lang = detect_language(message)
+    lang = lang or detect_language(message)
 
     intro = {
         "en": "🌍 I'm your travel planner! Ask about flights, hotels, or attractions.\n",
@@ -1,6 +1,9 @@
-from sentence_transformers import SentenceTransformer, util
 from typing import List, Optional
-import torch
+from app.utils.embedding_cache import cached_encode
+from app.utils.phrase_bank import phrase_bank
+from app.utils.keyword_matcher import KeywordMatcher
+from app.intents.intent_head import has_intent_head, predict_heads, INTENT_HEAD_MIN_CONFIDENCE
+from app.intents.lexical_classifier import lexical_predict, is_confident, record_stage
 
 intent_labels = [
     "order_food", "find_restaurant", "recommendation",
@@ -108,32 +111,41 @@ domain_keywords = {
     ]
 }
 
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+phrase_bank.register("intent", intent_examples)
+# Substring matching on purpose: stems like "makan" should also count inside "makanan"
+DOMAIN_KEYWORD_MATCHER = KeywordMatcher(domain_keywords)
 
-label_vectors = {
-    intent: model.encode(examples, convert_to_tensor=True)
-    for intent, examples in intent_examples.items()
-}
+def classify_intent(message: str, threshold: float = 0.55, mode: str = "text", analysis=None,
+                    record: bool = True) -> Optional[str]:
+    """`record=False` for a secondary lookup within a turn already counted in cascade_stats."""
+    # Stage 1: hashed char n-grams answer plain requests (and reject out-of-scope ones) without running the encoder
+    lexical = analysis.lexical if analysis else lexical_predict(message)
+    if is_confident(lexical, "intent"):
+        if record:
+            record_stage("intent", "lexical")
+        return lexical["intent"]
+    if record:
+        record_stage("intent", "embedding")
+
+    # Stage 2: trained head (if one is deployed), then nearest-example scoring
+    query_vec = None if analysis else cached_encode(message)
+    if has_intent_head():
+        head_prediction = analysis.head_prediction if analysis else predict_heads(query_vec)[0]
+        if head_prediction["intent_confidence"] >= INTENT_HEAD_MIN_CONFIDENCE:
+            return head_prediction["intent"]
 
-def classify_intent(message: str, threshold: float = 0.55, mode: str = "text") -> Optional[str]:
-    query_vec = model.encode(message, convert_to_tensor=True)
+    phrase_scores = analysis.phrase_scores if analysis else phrase_bank.match(query_vec)
+    intent_scores = phrase_scores["intent"]
     best_score = 0.0
     selected_intent = None
 
-    msg_lower = message.lower()
-    domain_score = {domain: 0 for domain in domain_keywords}
-    for domain, keywords in domain_keywords.items():
-        for keyword in keywords:
-            if keyword in msg_lower:
-                domain_score[domain] += 1
+    matched = DOMAIN_KEYWORD_MATCHER.labels(message)
+    domain_score = {domain: len(matched.get(domain, [])) for domain in domain_keywords}
 
     dominant_domain = max(domain_score, key=domain_score.get)
     domain_boost = 0.05 if domain_score[dominant_domain] > 0 else 0.0
 
-    for intent, vectors in label_vectors.items():
-        cos_scores = util.cos_sim(query_vec, vectors)
-        score = torch.max(cos_scores).item()
-
+    for intent, score in intent_scores.items():
         if intent_domains[intent] == dominant_domain:
             score += domain_boost
 
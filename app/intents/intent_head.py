@@ -0,0 +1,68 @@
+# app/intents/intent_head.py
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.model_registry import encoder_key, MULTILINGUAL_MODEL
+
+INTENT_HEAD_PATH = os.getenv("INTENT_HEAD_PATH", "model/intent_head.joblib")
+INTENT_HEAD_MIN_CONFIDENCE = float(os.getenv("INTENT_HEAD_MIN_CONFIDENCE", "0.5"))
+
+_head: Optional[Dict] = None
+
+
+def load_intent_head(path: str = INTENT_HEAD_PATH) -> Optional[Dict]:
+    """Load the classifier written by scripts/train_intent_head.py, if it matches the active encoder."""
+    global _head
+    if not os.path.exists(path):
+        return None
+    try:
+        import joblib
+
+        head = joblib.load(path)
+    except Exception as e:
+        print(f"[IntentHead] ⚠️ Could not load {path}: {e}")
+        return None
+
+    if head.get("encoder") != encoder_key(MULTILINGUAL_MODEL):
+        print(f"[IntentHead] ⚠️ {path} was trained on {head.get('encoder')}, ignoring it")
+        return None
+
+    _head = head
+    print(f"[IntentHead] ✅ Loaded {head.get('kind', 'classifier')} head from {path}")
+    return _head
+
+
+def has_intent_head() -> bool:
+    return _head is not None
+
+
+def predict_heads(vectors: np.ndarray) -> List[Dict[str, object]]:
+    """Predict intent and domain, with calibrated probabilities, for a batch of embeddings."""
+    if _head is None:
+        return []
+
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    matrix = matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+    intent_proba = _head["intent"].predict_proba(matrix)
+    domain_proba = _head["domain"].predict_proba(matrix)
+    intent_idx = intent_proba.argmax(axis=1)
+    domain_idx = domain_proba.argmax(axis=1)
+    intent_classes = _head["intent"].classes_
+    domain_classes = _head["domain"].classes_
+
+    return [
+        {
+            "intent": str(intent_classes[i]),
+            "intent_confidence": float(intent_proba[row, i]),
+            "domain": str(domain_classes[d]),
+            "domain_confidence": float(domain_proba[row, d]),
+        }
+        for row, (i, d) in enumerate(zip(intent_idx, domain_idx))
+    ]
+
+
+load_intent_head()
@@ -0,0 +1,68 @@
+# app/intents/lexical_classifier.py
+
+import os
+import threading
+from typing import Dict, Optional
+
+LEXICAL_MODEL_PATH = os.getenv("LEXICAL_MODEL_PATH", "model/lexical_classifier.joblib")
+LEXICAL_MIN_CONFIDENCE = float(os.getenv("LEXICAL_MIN_CONFIDENCE", "0.85"))
+
+# Rejection class of the intent model, trained on out-of-scope messages; predicted as intent None
+NO_INTENT = "__none__"
+
+# How often each stage of the cascade made the final call
+cascade_stats: Dict[str, Dict[str, int]] = {
+    "intent": {"lexical": 0, "embedding": 0},
+    "domain": {"keyword": 0, "lexical": 0, "embedding": 0},
+}
+_stats_lock = threading.Lock()
+
+_model: Optional[Dict] = None
+
+
+def record_stage(task: str, stage: str) -> None:
+    with _stats_lock:
+        cascade_stats[task][stage] += 1
+
+
+def load_lexical_model(path: str = LEXICAL_MODEL_PATH) -> Optional[Dict]:
+    """Load the hashed char n-gram classifiers written by scripts/train_intent_head.py."""
+    global _model
+    if not os.path.exists(path):
+        return None
+    try:
+        import joblib
+
+        _model = joblib.load(path)
+        print(f"[Lexical] ✅ Loaded lexical classifier from {path}")
+    except Exception as e:
+        print(f"[Lexical] ⚠️ Could not load {path}: {e}")
+    return _model
+
+
+def lexical_predict(text: str) -> Optional[Dict[str, object]]:
+    """Cheap first-stage prediction of intent and domain; None when no lexical model is deployed.
+
+    A message the intent model places in its rejection class gets intent None, so a confident
+    rejection is answered without the encoder just like a confident intent.
+    """
+    if _model is None or not text.strip():
+        return None
+
+    intent_proba = _model["intent"].predict_proba([text])[0]
+    domain_proba = _model["domain"].predict_proba([text])[0]
+    i, d = intent_proba.argmax(), domain_proba.argmax()
+    intent = str(_model["intent"].classes_[i])
+    return {
+        "intent": None if intent == NO_INTENT else intent,
+        "intent_confidence": float(intent_proba[i]),
+        "domain": str(_model["domain"].classes_[d]),
+        "domain_confidence": float(domain_proba[d]),
+    }
+
+
+def is_confident(prediction: Optional[Dict[str, object]], task: str) -> bool:
+    return bool(prediction) and prediction[f"{task}_confidence"] >= LEXICAL_MIN_CONFIDENCE
+
+
+load_lexical_model()
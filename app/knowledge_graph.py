@@ -11,10 +11,13 @@ def update_user_profile(user_id: str, message: str):
     user_uri = URIRef(f"http://example.org/{user_id}")
     user_graph.user_graph.add((user_uri, PREF.recent_search, Literal(message.lower())))
 
-    # Optional: keyword extraction → preferences
+    # Optional: keyword extraction → preferences, labelled with their domain once when first seen
+    # (or when a preference stored without one comes up again)
     keywords = extract_keywords(message)
     for kw in keywords:
-        user_graph.user_graph.add((user_uri, PREF.likes, Literal(kw.lower())))
+        if user_graph.has_preference_domain(user_id, kw):
+            continue
+        user_graph.add_user_preference(user_id, kw)
 
 def build_context_prompt(user_id: str) -> str:
     prefs = user_graph.get_user_preference_tags(user_id)
@@ -1,12 +1,17 @@
 # app/llama_agent.py
 
 import os
+import time
+import hashlib
+from typing import Optional
 from openai import OpenAI
 from langdetect import detect
 from app.rag_engine import retrieve, format_rag_context
 from app.intents.intent_classifier import classify_intent
 from app.utils.domain_detector import detect_domain
 from app.utils.user_graph import user_graph
+from app.utils.embedding_cache import cached_encode
+from app.utils.response_cache import ResponseCache
 
 client = OpenAI(
     api_key=os.getenv("GROG_API_KEY"),
@@ -15,8 +20,34 @@ client = OpenAI(
 
 MODEL_NAME = "llama3-8b-8192"
 
+# Response cache. Entries expire after the TTL of the call site that made them
+# (LLM_CACHE_TTL_S for untagged calls); prompts marked personal are never cached.
+LLM_CACHE_MB = float(os.getenv("LLM_CACHE_MB", "32"))  # 0 disables
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_TTLS = {
+    "payment_methods": 24 * 3600,          # the same answer for every user
+    "listing_description": 7 * 24 * 3600,  # depends only on the item
+    "web_summary": 3600,                   # summaries of live search results
+    "delivery_eta": 600,
+    "order_total": 600,
+}
+# Semantic tier: reuse an answer when the call's `semantic_key` embeds close to a cached one
+LLM_SEMANTIC_CACHE = os.getenv("LLM_SEMANTIC_CACHE", "0") == "1"
+LLM_SEMANTIC_CACHE_SIZE = int(os.getenv("LLM_SEMANTIC_CACHE_SIZE", "2048"))
+LLM_SEMANTIC_MIN_SIMILARITY = float(os.getenv("LLM_SEMANTIC_MIN_SIMILARITY", "0.95"))
+LLM_USD_PER_MTOK = float(os.getenv("LLM_USD_PER_MTOK", "0.08"))  # blended input/output price, for stats
 
-def ask_llama(prompt: str, temperature: float = 0.3) -> str:
+FAILED_RESPONSE = "Sorry, AI connection failed."
+
+response_cache = ResponseCache(
+    max_bytes=int(LLM_CACHE_MB * 1024 * 1024),
+    max_semantic_entries=LLM_SEMANTIC_CACHE_SIZE if LLM_SEMANTIC_CACHE else 0,
+    min_similarity=LLM_SEMANTIC_MIN_SIMILARITY,
+)
+
+
+def _complete(prompt: str, temperature: float):
+    """(text, total tokens) from the API, or None when the call fails."""
     messages = [{"role": "user", "content": prompt}]
     try:
         response = client.chat.completions.create(
@@ -24,7 +55,54 @@ def ask_llama(prompt: str, temperature: float = 0.3) -> str:
             messages=messages,
             temperature=temperature,
         )
-        return response.choices[0].message.content.strip()
+        text = response.choices[0].message.content.strip()
+        usage = getattr(response, "usage", None)
+        # ~4 characters per token when the provider reports no usage
+        tokens = usage.total_tokens if usage else (len(prompt) + len(text)) // 4
+        return text, tokens
     except Exception as e:
-        return "Sorry, AI connection failed."
+        print(f"[LLM] ❌ Request failed: {e}")
+        return None
+
+
+def ask_llama(prompt: str, temperature: float = 0.3, site: str = "", personal: bool = False,
+              semantic_key: Optional[str] = None, scope: str = "") -> str:
+    """Answer `prompt`, from the response cache when possible.
+
+    `site` names the call site and picks its TTL. Set `personal` when the prompt carries
+    user-specific context (profile, history, address): such prompts skip the cache.
+    `semantic_key` is a short text standing for what the answer depends on (e.g. the item
+    being listed) for the semantic tier, since whole prompts are too long to embed
+    meaningfully; answers are only reused within the same site and `scope` (e.g. intent
+    and language).
+    """
+    if personal or not response_cache.enabled:
+        if personal:
+            response_cache.bypass()
+        result = _complete(prompt, temperature)
+        return result[0] if result else FAILED_RESPONSE
+
+    key = hashlib.sha256(f"{MODEL_NAME}\0{temperature}\0{prompt}".encode("utf-8")).hexdigest()
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    bucket, vector = (MODEL_NAME, temperature, site, scope), None
+    if response_cache.max_semantic_entries and semantic_key:
+        vector = cached_encode(semantic_key)
+        cached = response_cache.get_similar(bucket, vector)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    result = _complete(prompt, temperature)
+    if result is None:
+        return FAILED_RESPONSE
+    text, tokens = result
+    response_cache.put(key, text, LLM_CACHE_TTLS.get(site, LLM_CACHE_TTL_S),
+                       time.perf_counter() - started, tokens, bucket, vector)
+    return text
+
 
+def llm_cache_stats() -> dict:
+    return response_cache.stats(LLM_USD_PER_MTOK)
@@ -6,10 +6,14 @@ from dotenv import load_dotenv
 from flask import Flask, request, jsonify, render_template
 from flask import redirect, session, url_for
 from huggingface_hub import login
-from app.llama_agent import ask_llama, MODEL_NAME
+from app.llama_agent import ask_llama, MODEL_NAME, llm_cache_stats
 from app.utils.user_graph import user_graph, add_recent_search, store_feedback, get_user_preference_tags, get_recent_searches
 from app.agent_orchestrator import run_orchestrated_agent
 from app.voice.voice_handler import transcribe_audio
+from app.utils.model_registry import memory_report
+from app.utils.embedding_cache import embedding_cache
+from app.intents.lexical_classifier import cascade_stats
+from app.rag_engine import load_rag_index, rag_status, retrieval_cache, enable_hot_reload
 
 load_dotenv()
 hf_token = os.getenv("HUGGINGFACE_TOKEN", "").strip()
@@ -22,6 +26,7 @@ def create_app():
     app.secret_key = os.getenv("SECRET_KEY") or secrets.token_hex(32)
     from app.utils import init_graph
     init_graph()
+    enable_hot_reload()
 
     from app.infobip_routes import infobip_bp
     app.register_blueprint(infobip_bp)
@@ -75,8 +80,23 @@ def create_app():
             "message": "LocalLoop AI Agent running",
             "model": MODEL_NAME,
             "profile_graph_triples": size,
+            "models": memory_report(),
+            "embedding_cache": embedding_cache.stats(),
+            "classifier_cascade": cascade_stats,
+            "rag_index": rag_status(),
+            "retrieval_cache": retrieval_cache.stats(),
+            "llm_cache": llm_cache_stats(),
         })
 
+    @app.route("/admin/rag/reload", methods=["POST"])
+    def reload_rag():
+        # Disabled unless ADMIN_TOKEN is set; the watcher picks up new builds on its own
+        admin_token = os.getenv("ADMIN_TOKEN", "")
+        if not admin_token or not secrets.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token):
+            return jsonify({"error": "Forbidden"}), 403
+        force = request.args.get("force") == "1"
+        return jsonify({"reloaded": load_rag_index(force=force), "rag_index": rag_status()})
+
     @app.route("/graph", methods=["GET"])
     def view_graph():
         if "phone" not in session:
@@ -1,57 +1,358 @@
 #app/rag_engine.py
 
-from typing import List
+from typing import Dict, List, Optional, Union
 import faiss
 import numpy as np
 import os
+import re
 import json
-from sentence_transformers import SentenceTransformer
+import time
+import threading
+from app.utils.model_registry import encoder_key, ENGLISH_MODEL, MULTILINGUAL_MODEL
+from app.utils.embedding_cache import cached_encode
+from app.utils.ann_index import index_kind, search_params, set_search_params, selector_params
+from app.utils.document_store import DocumentStore, read_documents, filter_terms, FILTER_FIELDS
+from app.utils.retrieval_cache import RetrievalCache
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# One sub-index per domain, so a query only scans (and fills its k from) its own domain.
+# Each build writes a new INDEX_DIR/<version>/ and then points INDEX_META_PATH at it.
+INDEX_DIR = "model/faiss_index"
+INDEX_META_PATH = "model/faiss_index.json"
+LEGACY_DOCS_PATH = "model/documents.json"
+TOP_K = 5
+ENCODE_CHUNK = 256  # queries per encode call in retrieve_many()
 
-INDEX_PATH = "model/faiss_index.index"
-DOCS_PATH = "model/documents.json"
+# Defaults to the classification encoder so the turn embedding can be reused for retrieval
+RAG_ENCODER_MODEL = os.getenv("RAG_ENCODER_MODEL", MULTILINGUAL_MODEL)
 
-index = None
-metadata = []
+# Candidates per partition re-scored exactly against the full-precision vectors; 0 disables.
+# Worth enabling with compressed (fp16 / sq8 / pq) indexes.
+RAG_RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "0"))
+
+# Filtered queries matching at most this many documents are scored exactly against the stored
+# vectors; larger candidate sets are searched in the ANN index with an id selector
+RAG_FILTER_EXACT_MAX = int(os.getenv("RAG_FILTER_EXACT_MAX", "5000"))
+
+# Cached retrieve() results (0 disables), reused for queries in the same domain with the same filters
+# whose embedding is at least this cosine-similar to a cached one
+RAG_RESULT_CACHE_SIZE = int(os.getenv("RAG_RESULT_CACHE_SIZE", "2048"))
+RAG_RESULT_CACHE_MIN_SIMILARITY = float(os.getenv("RAG_RESULT_CACHE_MIN_SIMILARITY", "0.97"))
+
+# How often workers check faiss_index.json for a new build; 0 disables the watcher
+RAG_RELOAD_INTERVAL_S = float(os.getenv("RAG_RELOAD_INTERVAL_S", "30"))
+
+# Indexes built before the metadata file existed used the English model with raw L2 vectors
+LEGACY_INDEX_META = {"encoder": ENGLISH_MODEL, "metric": "l2", "normalized": False}
+
+# Read-only memory mapping: workers on a host share the index pages instead of each holding a copy
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+def domain_key(domain: str) -> str:
+    return (domain or "").strip().lower() or "general"
+
+def version_dir(version: str) -> str:
+    return os.path.join(INDEX_DIR, version)
+
+def partition_path(version: str, domain: str) -> str:
+    return os.path.join(version_dir(version), re.sub(r"[^\w-]+", "_", domain_key(domain)) + ".index")
+
+def documents_path(version: str) -> str:
+    return os.path.join(version_dir(version), "documents.sqlite")
+
+def read_all_documents(version: str) -> List[dict]:
+    """Every entry of a build, for the index builder; handles the JSON files of older builds."""
+    json_path = os.path.join(version_dir(version), "documents.json") if version else LEGACY_DOCS_PATH
+    if version and os.path.exists(documents_path(version)):
+        return read_documents(documents_path(version))
+    with open(json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def vectors_path(version: str) -> str:
+    return os.path.join(version_dir(version), "vectors.npy")
+
+def vector_ids_path(version: str) -> str:
+    return os.path.join(version_dir(version), "vector_ids.npy")
+
+def load_index_meta(path: str = INDEX_META_PATH) -> dict:
+    if not os.path.exists(path):
+        return dict(LEGACY_INDEX_META)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def read_index(path: str) -> faiss.Index:
+    try:
+        return faiss.read_index(path, MMAP_FLAGS)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+class RagIndex:
+    """One loaded, never-modified build of the RAG index.
+
+    Reloads build a new RagIndex and swap the module reference, so a retrieve()
+    that already picked up the old one finishes on it.
+    """
+
+    def __init__(self, meta: dict):
+        self.meta = meta
+        self.version = meta["version"]
+        self.indexes: Dict[str, faiss.Index] = {
+            domain: read_index(partition_path(self.version, domain)) for domain in meta["partitions"]
+        }
+        for index in self.indexes.values():
+            set_search_params(index, search_params())
+        # Documents are read per query, so startup doesn't grow with the corpus
+        self.documents = DocumentStore(documents_path(self.version))
+        # Memory-mapped float32 store, sorted by vector id; only pages of re-ranked or filtered rows are read
+        self.store_ids, self.store_vectors = None, None
+        if meta.get("store_sorted") and os.path.exists(vectors_path(self.version)):
+            self.store_ids = np.load(vector_ids_path(self.version), mmap_mode="r")
+            self.store_vectors = np.load(vectors_path(self.version), mmap_mode="r")
+        self.rerank = bool(RAG_RERANK_CANDIDATES) and self.store_vectors is not None
+        # Builds before the postings table existed can't be filtered
+        self.filterable = bool(meta.get("postings"))
+        self.loaded_at = time.time()
+
+    def describe(self) -> str:
+        return ", ".join(f"{domain}={index.ntotal} {index_kind(index)}" for domain, index in self.indexes.items())
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "encoder": self.meta.get("encoder"),
+            "documents": self.meta.get("documents"),
+            "partitions": self.meta.get("partitions"),
+            "built_at": self.meta.get("built_at"),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)),
+        }
+
+    def _vectors(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(self.store_vectors[np.searchsorted(self.store_ids, ids)], dtype=np.float32)
+
+    def candidates(self, partitions: List[str], filters: Dict[str, List[str]]) -> np.ndarray:
+        return self.documents.candidates({**filters, "domain": filter_terms(partitions)})
+
+    def top_ids(self, query_matrix: np.ndarray, partitions: List[str],
+                candidates: Optional[np.ndarray] = None) -> List[List[int]]:
+        """Top ids per query row across `partitions`, restricted to the sorted ids in `candidates` when given."""
+        if candidates is not None and self.store_vectors is not None and len(candidates) <= RAG_FILTER_EXACT_MAX:
+            # Small filtered set: score it exactly, one matrix product for all the queries
+            scores = query_matrix @ self._vectors(candidates).T
+            ids = np.broadcast_to(candidates, scores.shape)
+        else:
+            k = max(TOP_K, RAG_RERANK_CANDIDATES) if self.rerank else TOP_K
+            results = []
+            for name in partitions:
+                index = self.indexes[name]
+                params = selector_params(index, candidates) if candidates is not None else None
+                results.append(index.search(query_matrix, min(k, index.ntotal), params=params))
+            scores = np.hstack([D for D, _ in results])
+            ids = np.hstack([I for _, I in results])
+            if self.rerank:
+                found = np.where(ids >= 0, ids, self.store_ids[0])
+                scores = np.einsum("qkd,qd->qk", self._vectors(found), query_matrix)
+            scores = np.where(ids >= 0, scores, -np.inf)
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :TOP_K]
+        top_scores = np.take_along_axis(scores, order, axis=1)
+        top = np.take_along_axis(ids, order, axis=1)
+        return [[int(i) for i, score in zip(row_ids, row_scores) if score > -np.inf]
+                for row_ids, row_scores in zip(top, top_scores)]
+
+    def search(self, query_matrix: np.ndarray, partitions: List[str],
+               candidates: Optional[np.ndarray] = None) -> List[List[dict]]:
+        """Top entries per query row; documents for the whole batch are fetched in one lookup."""
+        top = self.top_ids(query_matrix, partitions, candidates)
+        entries = self.documents.fetch({i for row in top for i in row})
+        return [[entries[i] for i in row if i in entries] for row in top]
+
+
+_active: Optional[RagIndex] = None
+_reload_lock = threading.Lock()
+_watcher_pid: Optional[int] = None
+_fork_hook_registered = False
+retrieval_cache = RetrievalCache(RAG_RESULT_CACHE_SIZE, RAG_RESULT_CACHE_MIN_SIMILARITY)
+
+def load_rag_index(force: bool = False) -> bool:
+    """Load the build faiss_index.json points at and swap it in; True when the active index changed."""
+    global _active
+    with _reload_lock:
+        meta = load_index_meta()
+        version = meta.get("version")
+        if not os.path.exists(INDEX_META_PATH) and not os.path.exists(LEGACY_DOCS_PATH):
+            print("[RAG] ⚠️ Index or metadata file not found.")
+            return False
+        if meta.get("encoder") != encoder_key(RAG_ENCODER_MODEL) or not version:
+            print(f"[RAG] ⚠️ Index was built with {meta.get('encoder')} ({meta.get('layout', 'single index')}), "
+                  f"expected per-domain {encoder_key(RAG_ENCODER_MODEL)}. Run scripts/build_faiss_index.py --migrate.")
+            return False
+        if not force and _active is not None and _active.version == version:
+            return False
+        if not os.path.exists(documents_path(version)):
+            print(f"[RAG] ⚠️ Build {version} has no document store. Run scripts/build_faiss_index.py.")
+            return False
 
-def load_rag_index():
-    global index, metadata
-    if os.path.exists(INDEX_PATH) and os.path.exists(DOCS_PATH):
         try:
-            index = faiss.read_index(INDEX_PATH)
-            with open(DOCS_PATH, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-            print(f"[RAG] ✅ Loaded {len(metadata)} documents into FAISS index.")
+            snapshot = RagIndex(meta)
         except Exception as e:
-            print(f"[RAG] ❌ Failed to load index: {e}")
-    else:
-        print("[RAG] ⚠️ Index or metadata file not found.")
+            print(f"[RAG] ❌ Failed to load index {version}: {e}")
+            return False
+        previous, _active = _active, snapshot
+        # Keys include the version, so old entries can't be served; this just frees them
+        retrieval_cache.clear()
+        action = "Mapped" if previous is None else ("Reloaded" if previous.version == version else f"Swapped {previous.version} ->")
+        print(f"[RAG] ✅ {action} {version}: {meta['documents']} documents ({meta['encoder']}): {snapshot.describe()}")
+        return True
+
+def rag_status() -> Optional[Dict[str, object]]:
+    return _active.status() if _active else None
+
+def _watch_index(interval: float):
+    last_mtime = None
+    while True:
+        time.sleep(interval)
+        try:
+            mtime = os.stat(INDEX_META_PATH).st_mtime
+        except OSError:
+            continue
+        if mtime != last_mtime:
+            last_mtime = mtime
+            load_rag_index()
+
+def start_index_watcher(interval: float = RAG_RELOAD_INTERVAL_S):
+    """Start this process's reload thread, once."""
+    global _watcher_pid
+    if interval > 0 and _watcher_pid != os.getpid():
+        _watcher_pid = os.getpid()
+        threading.Thread(target=_watch_index, args=(interval,), name="rag-index-watcher", daemon=True).start()
+
+def _after_fork_in_child():
+    global _reload_lock
+    # The parent's watcher may have held the lock at fork time, and the snapshot's SQLite
+    # connection must not be shared across processes
+    _reload_lock = threading.Lock()
+    if _active is not None:
+        load_rag_index(force=True)
+    start_index_watcher()
+
+def enable_hot_reload():
+    """Watch for new builds in this process and in every worker forked from it (e.g. gunicorn --preload).
+
+    Called by the web app; scripts that import this module only load the index.
+    """
+    global _fork_hook_registered
+    start_index_watcher()
+    if not _fork_hook_registered:
+        _fork_hook_registered = True
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def shares_turn_embedding() -> bool:
+    """True when retrieval uses the same vectors as TurnAnalysis.embedding."""
+    return RAG_ENCODER_MODEL == MULTILINGUAL_MODEL
 
-def retrieve(query: str, domain: str, user_id: str) -> List[str]:
-    if not index or not metadata:
-        return ["[RAG unavailable] No index found."]
+def _query_matrix(queries: List[str], query_vecs, normalized: bool) -> np.ndarray:
+    if query_vecs is None:
+        # Chunked so a bulk job never exceeds one embedding-server request
+        query_vecs = np.vstack([cached_encode(list(queries[i:i + ENCODE_CHUNK]), RAG_ENCODER_MODEL)
+                                for i in range(0, len(queries), ENCODE_CHUNK)])
+    matrix = np.atleast_2d(np.asarray(query_vecs, dtype=np.float32))
+    if normalized:
+        matrix = matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+    return matrix
 
+def query_filters(filters: Optional[Dict[str, object]]) -> Dict[str, List[str]]:
+    """Normalize e.g. {"location": "Menteng", "tags": ["sushi"]} to terms; empty values are dropped.
+
+    The domain always comes from retrieve()'s `domain` argument.
+    """
+    terms = {field: filter_terms(value) for field, value in (filters or {}).items()
+             if field in FILTER_FIELDS and field != "domain"}
+    return {field: values for field, values in terms.items() if values}
+
+def retrieve(query: str, domain: str, user_id: str, query_vec: Optional[np.ndarray] = None,
+             filters: Optional[Dict[str, object]] = None) -> List[str]:
+    """Top documents for `query` in `domain`; pass `query_vec` to reuse an embedding from RAG_ENCODER_MODEL.
+
+    `filters` maps location / tags to a value or list; a document must match each
+    given field on at least one word. When nothing matches, the whole domain is searched.
+    """
+    query_vecs = None if query_vec is None else [query_vec]
+    return retrieve_many([query], domain, user_id, query_vecs, [filters])[0]
+
+def retrieve_many(queries: List[str], domains: Union[str, List[str]], user_id: str = "",
+                  query_vecs: Optional[np.ndarray] = None,
+                  filters: Union[None, Dict[str, object], List[Optional[Dict[str, object]]]] = None) -> List[List[str]]:
+    """retrieve() for a batch of queries, with results in input order.
+
+    `domains` and `filters` are either shared by every query or given per query. Queries are
+    encoded together, and each group sharing a domain and filters costs one candidate lookup
+    and one search per partition for its whole query matrix.
+    """
+    snapshot = _active
+    if snapshot is None:
+        return [["[RAG unavailable] No index found."] for _ in queries]
+    if not len(queries):
+        return []
+    domains = [domains] * len(queries) if isinstance(domains, str) else list(domains)
+    filters = list(filters) if isinstance(filters, list) else [filters] * len(queries)
+
+    results: List[Optional[List[str]]] = [None] * len(queries)
+    groups: Dict[tuple, List[int]] = {}
+    for row, (domain, row_filters) in enumerate(zip(domains, filters)):
+        # Same matching as the old post-filter: any document domain containing the requested one
+        partitions = tuple(name for name in snapshot.indexes if domain.lower() in name)
+        if not partitions:
+            results[row] = ["[No domain-specific RAG results found]"]
+            continue
+        terms = query_filters(row_filters)
+        groups.setdefault((partitions, tuple(sorted((f, tuple(v)) for f, v in terms.items()))), []).append(row)
+
+    # Timed from before encoding, so a miss's cost (and what a hit saves) includes its share of it
+    started = time.perf_counter()
     try:
-        query_vec = model.encode([query])
-        D, I = index.search(np.array(query_vec).astype("float32"), k=5)
-
-        results = []
-        for i in I[0]:
-            if i < len(metadata):
-                entry = metadata[i]
-                if domain.lower() in entry.get("domain", "").lower():
-                    content = entry.get("description") or entry.get("content", "")
-                    results.append(content)
-        return results or ["[No domain-specific RAG results found]"]
+        query_matrix = _query_matrix(queries, query_vecs, snapshot.meta.get("normalized"))
     except Exception as e:
         print(f"[RAG] ❌ Error during retrieval: {e}")
-        return ["[RAG error] Could not complete retrieval."]
+        return [["[RAG error] Could not complete retrieval."] for _ in queries]
+    encode_seconds = (time.perf_counter() - started) / len(queries)
+
+    for (partitions, filter_key), rows in groups.items():
+        cache_key = (snapshot.version, partitions, filter_key)
+        misses = []
+        for row in rows:
+            results[row] = retrieval_cache.get(cache_key, query_matrix[row], time.perf_counter())
+            if results[row] is None:
+                misses.append(row)
+        if not misses:
+            continue
+
+        started = time.perf_counter()
+        try:
+            candidates = None
+            if filter_key and snapshot.filterable:
+                candidates = snapshot.candidates(list(partitions), dict(filter_key))
+                if not len(candidates):
+                    shown = {field: list(terms) for field, terms in filter_key}
+                    print(f"[RAG] No {'/'.join(partitions)} documents match {shown}, searching the whole domain.")
+                    candidates = None
+            found = snapshot.search(query_matrix[misses], list(partitions), candidates)
+        except Exception as e:
+            print(f"[RAG] ❌ Error during retrieval: {e}")
+            for row in misses:
+                results[row] = ["[RAG error] Could not complete retrieval."]
+            continue
+
+        seconds = encode_seconds + (time.perf_counter() - started) / len(misses)
+        for row, entries in zip(misses, found):
+            results[row] = [entry.get("description") or entry.get("content", "") for entry in entries] \
+                or ["[No domain-specific RAG results found]"]
+            retrieval_cache.put(cache_key, query_matrix[row], results[row], seconds)
+    return results
 
 def format_rag_context(docs: List[str], domain: str) -> str:
     if not docs:
         return f"--- No {domain} context found ---"
     return f"--- {domain} Context ---\n" + "\n".join(f"- {doc}" for doc in docs)
 
-# Load on startup
+# Load on startup; the app then calls enable_hot_reload() to pick up new builds as they are published
 load_rag_index()
@@ -48,8 +48,9 @@ next_step_prompts = {
 }
 
 
-def get_task_stage(message: str) -> str:
-    intent = classify_intent(message)
+def get_task_stage(message: str, intent: str = None) -> str:
+    if intent is None:
+        intent = classify_intent(message)
     return task_flow_stages.get(intent, "search")
 
 
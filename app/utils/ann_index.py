@@ -0,0 +1,154 @@
+# app/utils/ann_index.py
+
+import os
+import math
+from typing import Dict
+
+import faiss
+import numpy as np
+
+# Index type for each RAG partition: "flat" (exact), "hnsw" or "ivf"
+RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat").lower()
+HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "200"))
+IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "0"))  # 0 picks ~4*sqrt(n) per partition
+
+# How vectors are stored inside the index: "float32", "fp16", "sq8" (4x smaller) or "pq" (product quantization)
+RAG_INDEX_ENCODING = os.getenv("RAG_INDEX_ENCODING", "float32").lower()
+PQ_M = int(os.getenv("RAG_PQ_M", "0"))  # sub-quantizers (8 bits each); 0 picks one per 8 dimensions
+
+# Search-time knobs, applied when an index is loaded
+HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "8"))
+
+MIN_POINTS_PER_LIST = 39  # fewer training points per centroid and k-means is unreliable
+PQ_CENTROIDS = 256
+ENCODINGS = {"float32": "Flat", "fp16": "SQfp16", "sq8": "SQ8", "pq": "PQ"}
+
+
+def build_params(index_type: str = None, encoding: str = None, **overrides) -> Dict[str, object]:
+    """Construction parameters for `index_type` and `encoding`, from the environment unless overridden."""
+    index_type = (index_type or RAG_INDEX_TYPE).lower()
+    encoding = (encoding or RAG_INDEX_ENCODING).lower()
+    if index_type == "hnsw":
+        params = {"type": "hnsw", "m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    elif index_type == "ivf":
+        params = {"type": "ivf", "nlist": IVF_NLIST}
+    elif index_type == "flat":
+        params = {"type": "flat"}
+    else:
+        raise ValueError(f"Unknown RAG index type: {index_type}")
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown RAG index encoding: {encoding}")
+    params["encoding"] = encoding
+    if encoding == "pq":
+        params["pq_m"] = PQ_M
+    params.update({key: value for key, value in overrides.items() if key in params and value is not None})
+    return params
+
+
+def search_params() -> Dict[str, int]:
+    return {"ef_search": HNSW_EF_SEARCH, "nprobe": IVF_NPROBE}
+
+
+def ivf_nlist(params: Dict[str, object], n: int) -> int:
+    nlist = params.get("nlist") or int(4 * math.sqrt(max(n, 1)))
+    return min(nlist, n // MIN_POINTS_PER_LIST)
+
+
+def pq_m(params: Dict[str, object], dim: int) -> int:
+    m = params.get("pq_m") or max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _codec(params: Dict[str, object], n: int, dim: int) -> str:
+    encoding = params.get("encoding", "float32")
+    if encoding == "pq":
+        if n < MIN_POINTS_PER_LIST * PQ_CENTROIDS:
+            return ENCODINGS["sq8"]  # too few vectors to train the codebooks
+        return f"PQ{pq_m(params, dim)}"
+    return ENCODINGS[encoding]
+
+
+def factory_string(params: Dict[str, object], n: int, dim: int) -> str:
+    codec = _codec(params, n, dim)
+    if params["type"] == "hnsw":
+        return f"IDMap,HNSW{params['m']},{codec}"
+    if params["type"] == "ivf" and ivf_nlist(params, n) >= 2:
+        # IVF keeps its own ids, and unlike an IDMap wrapper still removes correctly
+        return f"IVF{ivf_nlist(params, n)},{codec}"
+    return f"IDMap,{codec}"
+
+
+def _inner(index: faiss.Index) -> faiss.Index:
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def make_index(vectors: np.ndarray, ids: np.ndarray, params: Dict[str, object]) -> faiss.Index:
+    """Build one inner-product partition over unit vectors with the given construction params.
+
+    Partitions too small to cluster fall back to a flat index, and too small to train
+    PQ codebooks to sq8.
+    """
+    index = faiss.index_factory(vectors.shape[1], factory_string(params, len(vectors), vectors.shape[1]),
+                                faiss.METRIC_INNER_PRODUCT)
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efConstruction = params["ef_construction"]
+    if not index.is_trained:
+        index.train(vectors)
+    if len(ids):
+        index.add_with_ids(vectors, ids.astype(np.int64))
+    return index
+
+
+def set_search_params(index: faiss.Index, params: Dict[str, int]) -> None:
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = params["ef_search"]
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = params["nprobe"]
+
+
+def selector_params(index: faiss.Index, ids: np.ndarray) -> faiss.SearchParameters:
+    """Search parameters restricting `index` to `ids`, keeping its efSearch / nprobe."""
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype=np.int64))
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    elif isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.selector_ref = selector  # the SWIG object doesn't keep the selector alive
+    return params
+
+
+def index_kind(index: faiss.Index) -> str:
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        kind, codes = "hnsw", faiss.downcast_index(inner.storage)
+    elif isinstance(inner, faiss.IndexIVF):
+        kind, codes = "ivf", inner
+    else:
+        kind, codes = "flat", inner
+    if isinstance(codes, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return f"{kind}-pq"
+    if isinstance(codes, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return f"{kind}-sq"
+    return kind
+
+
+def try_remove_ids(index: faiss.Index, ids) -> bool:
+    """Remove `ids` in place; False when the index type can't (HNSW), so the caller rebuilds it."""
+    try:
+        index.remove_ids(np.asarray(ids, dtype=np.int64))
+        return True
+    except RuntimeError:
+        return False
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return len(faiss.serialize_index(index))
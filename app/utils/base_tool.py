@@ -19,7 +19,7 @@ class AgentTool:
             return self.slots_module.extract_slots(intent, message)
         raise AttributeError(f"extract_slots not found in {self.domain}.slots")
 
-    def handle_checkout(self, intent: str, slots: Dict[str, Any], user_id: str) -> Any:
+    def handle_checkout(self, intent: str, slots: Dict[str, Any], user_id: str, analysis=None) -> Any:
         if hasattr(self.checkout_module, "handle"):
-            return self.checkout_module.handle(intent, slots, user_id)
+            return self.checkout_module.handle(intent, slots, user_id, analysis=analysis)
         raise AttributeError(f"handle not found in {self.domain}.checkout")
\ No newline at end of file
@@ -1,7 +1,8 @@
 # app/utils/context_followup.py
 
-from sentence_transformers import SentenceTransformer, util
 from app.utils.session_memory import get_last_intent, get_last_slots
+from app.utils.embedding_cache import cached_encode
+from app.utils.phrase_bank import phrase_bank
 
 
 FOLLOWUP_PHRASES = [
@@ -15,22 +16,20 @@ FOLLOWUP_PHRASES = [
     "okay, then?", "so what now?", "go on", "what did we decide?", "and after that?"
 ]
 
-embedding_model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-FOLLOWUP_EMBEDDINGS = embedding_model.encode(FOLLOWUP_PHRASES, convert_to_tensor=True)
+phrase_bank.register("followup", {"followup": FOLLOWUP_PHRASES})
 
-def is_contextual_followup(message: str, user_id: str, threshold: float = 0.70) -> bool:
+def is_contextual_followup(message: str, user_id: str, threshold: float = 0.70, analysis=None) -> bool:
     message = message.strip().lower()
     if not message:
         return False
 
     if len(message.split()) <= 4:
-        message_embedding = embedding_model.encode(message, convert_to_tensor=True)
-        similarities = util.cos_sim(message_embedding, FOLLOWUP_EMBEDDINGS)[0]
+        phrase_scores = analysis.phrase_scores if analysis else phrase_bank.match(cached_encode(message))
         try:
             threshold = float(threshold)
         except ValueError:
             threshold = 0.7
-        if float(similarities.max()) > threshold:
+        if phrase_scores["followup"]["followup"] > threshold:
             return True
 
     return get_last_intent(user_id) is not None
@@ -0,0 +1,187 @@
+# app/utils/corpus_dedup.py
+
+import re
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.ann_index import build_params, make_index
+
+# MinHash over character shingles; 32 bands of 4 rows put the LSH bucket threshold near
+# Jaccard 0.42, and candidates are then kept only above TEXT_JACCARD
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32
+SHINGLE_CHARS = 5
+TEXT_JACCARD = 0.8
+
+# Embedding pass: the nearest neighbours of each entry, merged above EMBEDDING_COSINE
+EMBEDDING_COSINE = 0.95
+EMBEDDING_NEIGHBOURS = 8
+EXACT_SEARCH_MAX = 20_000  # larger domains are searched through HNSW
+
+_MERSENNE = (1 << 31) - 1
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, _MERSENNE, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 1 << 62, MINHASH_PERMUTATIONS // LSH_BANDS, dtype=np.uint64) | np.uint64(1)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> bool:
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return False
+        self.parent[max(ri, rj)] = min(ri, rj)
+        return True
+
+
+def _shingles(text: str) -> np.ndarray:
+    text = re.sub(r"\W+", " ", text.lower()).strip()
+    if len(text) <= SHINGLE_CHARS:
+        grams = {text}
+    else:
+        grams = {text[i:i + SHINGLE_CHARS] for i in range(len(text) - SHINGLE_CHARS + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) & _MERSENNE for g in grams), dtype=np.uint64)
+
+
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    """(len(texts), MINHASH_PERMUTATIONS) MinHash signatures of the texts' character shingles."""
+    signatures = np.empty((len(texts), MINHASH_PERMUTATIONS), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        shingles = _shingles(text)
+        signatures[row] = ((_PERM_A[:, None] * shingles[None, :] + _PERM_B[:, None]) % _MERSENNE).min(axis=1)
+    return signatures
+
+
+def _domain(entry: dict) -> str:
+    return (entry.get("domain") or "general").strip().lower()
+
+
+def _groups(entries: List[dict]) -> np.ndarray:
+    """Entries only merge within their domain."""
+    _, group = np.unique([_domain(e) for e in entries], return_inverse=True)
+    return group.ravel()
+
+
+def text_duplicates(entries: List[dict], union: _UnionFind, threshold: float = TEXT_JACCARD) -> int:
+    """Union entries whose `content` MinHash similarity reaches `threshold`; linear in the corpus size.
+
+    Each band groups entries by domain and band hash, and every member is compared with its
+    bucket's first entry only, so a bucket of a thousand copies costs a thousand comparisons.
+    """
+    signatures = minhash_signatures([e["content"] for e in entries])
+    group = _groups(entries).astype(np.uint64)
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    merged = 0
+    for band in range(LSH_BANDS):
+        band_hash = signatures[:, band * rows:(band + 1) * rows] @ _BAND_MIX  # wraps mod 2**64
+        keys = np.stack([group, band_hash], axis=1)
+        _, first, bucket = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        leader = first[bucket.ravel()]
+        candidates = np.nonzero(leader != np.arange(len(entries)))[0]
+        if not len(candidates):
+            continue
+        similarity = (signatures[candidates] == signatures[leader[candidates]]).mean(axis=1)
+        for i in candidates[similarity >= threshold]:
+            merged += union.union(int(leader[i]), int(i))
+    return merged
+
+
+def embedding_duplicates(entries: List[dict], vectors: np.ndarray, union: _UnionFind,
+                         threshold: float = EMBEDDING_COSINE) -> int:
+    """Union entries whose unit vectors' cosine reaches `threshold`, via a k-NN search per domain."""
+    group = _groups(entries)
+    merged = 0
+    for g in np.unique(group):
+        rows = np.nonzero(group == g)[0]
+        if len(rows) < 2:
+            continue
+        params = build_params("flat", "float32") if len(rows) <= EXACT_SEARCH_MAX else build_params("hnsw", "float32")
+        index = make_index(vectors[rows], np.arange(len(rows), dtype=np.int64), params)
+        scores, neighbours = index.search(vectors[rows], min(EMBEDDING_NEIGHBOURS + 1, len(rows)))
+        for i, j in zip(*np.nonzero((scores >= threshold) & (neighbours >= 0))):
+            if neighbours[i, j] != i:
+                merged += union.union(int(rows[i]), int(rows[neighbours[i, j]]))
+    return merged
+
+
+def _richness(entry: dict) -> int:
+    return len(entry.get("content", "")) + len(entry.get("description") or "")
+
+
+def _merge(cluster: List[dict]) -> dict:
+    """Keep the most descriptive entry, with the tags and locations of the whole cluster."""
+    keep = max(cluster, key=_richness)
+    merged = dict(keep)
+    tags, locations = [], []
+    for e in [keep] + [e for e in cluster if e is not keep]:
+        tags += [t for t in e.get("tags") or [] if t not in tags]
+        for location in e.get("locations") or [e.get("location")]:
+            if location and location not in locations:
+                locations.append(location)
+    if tags:
+        merged["tags"] = tags
+    if len(locations) > 1:
+        merged["locations"] = locations
+    merged["duplicates"] = sorted({h for e in cluster if e is not keep
+                                   for h in [e["content_hash"]] + e.get("duplicates", [])})
+    return merged
+
+
+def deduplicate(entries: List[dict], embed: Optional[Callable[[List[dict]], np.ndarray]] = None,
+                known: Optional[Dict[str, str]] = None,
+                text_threshold: float = TEXT_JACCARD,
+                embedding_threshold: float = EMBEDDING_COSINE) -> Tuple[List[dict], Dict[str, int]]:
+    """Merge near-duplicate entries (which need `content_hash`); returns the kept entries, in order, and counts.
+
+    `embed` maps entries to unit vectors for the embedding pass (skipped without it).
+    `known` maps content hashes merged by an earlier build to the hash they were merged into;
+    those merges are re-applied directly, so their text never needs encoding again.
+    """
+    stats = {"entries": len(entries), "known": 0, "text": 0, "embedding": 0, "kept": len(entries)}
+    if not entries:
+        return entries, stats
+    union = _UnionFind(len(entries))
+
+    if known:
+        domains = [_domain(e) for e in entries]
+        first_by_hash = {}
+        for row, e in enumerate(entries):
+            first_by_hash.setdefault((domains[row], e["content_hash"]), row)
+        for row, e in enumerate(entries):
+            target = first_by_hash.get((domains[row], known.get(e["content_hash"])))
+            if target is not None:
+                stats["known"] += union.union(target, row)
+
+    stats["text"] = text_duplicates(entries, union, text_threshold)
+
+    if embed is not None:
+        # Entries already merged don't need a vector: the one their cluster keeps stands in for them,
+        # and is usually in the deployed store already
+        members: Dict[int, List[int]] = {}
+        for row in range(len(entries)):
+            members.setdefault(union.find(row), []).append(row)
+        pending = sorted(max(rows, key=lambda row: _richness(entries[row])) for rows in members.values())
+        vectors = embed([entries[row] for row in pending])
+        sub_union = _UnionFind(len(pending))
+        stats["embedding"] = embedding_duplicates([entries[row] for row in pending], vectors, sub_union,
+                                                  embedding_threshold)
+        for i, row in enumerate(pending):
+            union.union(pending[sub_union.find(i)], row)
+
+    clusters: Dict[int, List[dict]] = {}
+    for row, e in enumerate(entries):
+        clusters.setdefault(union.find(row), []).append(e)
+    kept = [_merge(cluster) if len(cluster) > 1 else cluster[0] for _, cluster in sorted(clusters.items())]
+    stats["kept"] = len(kept)
+    return kept, stats
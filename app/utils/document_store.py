@@ -0,0 +1,116 @@
+# app/utils/document_store.py
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE documents (
+    vector_id INTEGER PRIMARY KEY,
+    doc_key TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    domain TEXT,
+    document TEXT NOT NULL
+);
+CREATE TABLE postings (
+    field TEXT NOT NULL,
+    term TEXT NOT NULL,
+    vector_id INTEGER NOT NULL
+);
+CREATE INDEX postings_term ON postings (field, term, vector_id);
+"""
+
+# Entry fields retrieval can filter on, through the postings (inverted index) table
+FILTER_FIELDS = ("domain", "location", "tags")
+
+
+def filter_terms(value) -> List[str]:
+    """Lower-cased word tokens of a field value (a string or a list such as tags)."""
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return sorted({token for v in values if v for token in re.findall(r"\w+", str(v).lower())})
+
+
+def _postings(entries: List[dict]):
+    for e in entries:
+        for field in FILTER_FIELDS:
+            if field == "domain":
+                value = e.get("domain") or "general"
+            elif field == "location":
+                value = e.get("locations") or e.get("location")  # merged duplicates keep every location
+            else:
+                value = e.get(field)
+            for term in filter_terms(value):
+                yield field, term, e["vector_id"]
+
+
+def write_documents(entries: List[dict], path: str) -> None:
+    """Write RAG entries, keyed by vector id, to a new SQLite file at `path`."""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, ?, ?)",
+            ((e["vector_id"], e["doc_key"], e["content_hash"], e.get("domain"), json.dumps(e, ensure_ascii=False))
+             for e in entries),
+        )
+        conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", _postings(entries))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def read_documents(path: str) -> List[dict]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [json.loads(row[0]) for row in conn.execute("SELECT document FROM documents ORDER BY vector_id")]
+    finally:
+        conn.close()
+
+
+class DocumentStore:
+    """Read-only view of a documents.sqlite file, fetching only the rows a search returns.
+
+    Each version directory is immutable, so the file is opened with `immutable=1`
+    (no locking) and every worker on the host shares the OS page cache. It is opened once,
+    up front, and shared by all request threads: the open file stays readable after a later
+    build prunes its version directory, like the memory-mapped indexes next to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, params) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def fetch(self, vector_ids: Iterable[int]) -> Dict[int, dict]:
+        ids = [int(i) for i in vector_ids]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = self._query(
+            f"SELECT vector_id, document FROM documents WHERE vector_id IN ({placeholders})", ids)
+        return {vector_id: json.loads(document) for vector_id, document in rows}
+
+    def candidates(self, filters: Dict[str, List[str]]) -> np.ndarray:
+        """Sorted ids of entries matching every field in `filters`, each on any of its terms."""
+        clauses, params = [], []
+        for field, terms in filters.items():
+            clauses.append(f"SELECT vector_id FROM postings WHERE field = ? AND term IN ({','.join('?' * len(terms))})")
+            params += [field, *terms]
+        rows = self._query(" INTERSECT ".join(clauses) + " ORDER BY vector_id", params)
+        return np.fromiter((row[0] for row in rows), dtype=np.int64)
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM documents", ())[0][0]
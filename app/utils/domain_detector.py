@@ -1,13 +1,15 @@
 #app/utils/domain_detector.py
 
-import torch
-from sentence_transformers import SentenceTransformer, util
 from googletrans import Translator
 from app.intents.intent_classifier import classify_intent
 from app.lang_detect import detect_language
+from app.utils.embedding_cache import cached_encode
+from app.utils.phrase_bank import phrase_bank
+from app.utils.keyword_matcher import KeywordMatcher
+from app.intents.intent_head import has_intent_head, predict_heads, INTENT_HEAD_MIN_CONFIDENCE
+from app.intents.lexical_classifier import lexical_predict, is_confident, record_stage
 
 translator = Translator()
-embedding_model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
 
 DOMAIN_CANDIDATES = {
     "food": [
@@ -83,19 +85,8 @@ DOMAIN_CANDIDATES = {
     ]
 }
 
-PHRASE_TO_DOMAIN = {}
-ALL_PHRASES = []
-for domain, phrases in DOMAIN_CANDIDATES.items():
-    for phrase in phrases:
-        PHRASE_TO_DOMAIN[phrase] = domain
-        ALL_PHRASES.append(phrase)
-
-ALL_PHRASE_EMBEDDINGS = embedding_model.encode(ALL_PHRASES, convert_to_tensor=True)
-
-DOMAIN_EMBEDDINGS = {
-    domain: torch.mean(embedding_model.encode(phrases, convert_to_tensor=True), dim=0)
-    for domain, phrases in DOMAIN_CANDIDATES.items()
-}
+phrase_bank.register("domain", DOMAIN_CANDIDATES)
+DOMAIN_KEYWORD_MATCHER = KeywordMatcher(DOMAIN_CANDIDATES, word_boundary=True)
 
 def normalize_input(text: str, lang: str) -> str:
     if lang not in ["id", "en"]:
@@ -105,33 +96,50 @@ def normalize_input(text: str, lang: str) -> str:
             print(f"[Translation] ⚠️ {e}")
     return text
 
-def detect_domain(message: str, threshold: float = 0.6, top_k: int = 3, debug: bool = False) -> str:
-    lang = detect_language(message)
+def detect_domain(message: str, threshold: float = 0.6, top_k: int = 3, debug: bool = False, analysis=None,
+                  record: bool = True) -> str:
+    """`record=False` for lookups that aren't a user turn (e.g. labelling a stored preference)."""
+    lang = analysis.lang if analysis else detect_language(message)
     normalized_msg = normalize_input(message, lang).lower()
+    # The turn analysis already holds the embedding and intent of this exact text
+    shared = analysis if analysis and analysis.normalized == normalized_msg.strip() else None
 
-    for domain, keywords in DOMAIN_CANDIDATES.items():
-        if any(kw in normalized_msg for kw in keywords):
+    matched = DOMAIN_KEYWORD_MATCHER.labels(normalized_msg)
+    for domain in DOMAIN_CANDIDATES:
+        if domain in matched:
             if debug:
-                print(f"[DomainDetection] ✅ Rule-based match: '{domain}'")
+                print(f"[DomainDetection] ✅ Rule-based match: '{domain}' via {matched[domain]}")
+            if record:
+                record_stage("domain", "keyword")
             return domain
 
-    input_vec = embedding_model.encode(normalized_msg, convert_to_tensor=True)
-    cos_scores = util.cos_sim(input_vec, ALL_PHRASE_EMBEDDINGS)[0]
-    top_results = torch.topk(cos_scores, k=top_k)
-
-    best_domain = None
-    max_score = 0.0
-    for idx, score in zip(top_results.indices, top_results.values):
-        phrase = ALL_PHRASES[idx]
-        domain = PHRASE_TO_DOMAIN[phrase]
-        if score.item() > max_score:
-            max_score = score.item()
-            best_domain = domain
- 
+    lexical = shared.lexical if shared else lexical_predict(normalized_msg)
+    if is_confident(lexical, "domain"):
+        if record:
+            record_stage("domain", "lexical")
+        return lexical["domain"]
+    if record:
+        record_stage("domain", "embedding")
+
+    if has_intent_head():
+        prediction = shared.head_prediction if shared else predict_heads(cached_encode(normalized_msg))[0]
+        if prediction["domain_confidence"] >= INTENT_HEAD_MIN_CONFIDENCE:
+            return prediction["domain"]
+
+    if shared:
+        domain_scores = shared.phrase_scores["domain"]
+    else:
+        domain_scores = phrase_bank.match(cached_encode(normalized_msg))["domain"]
+
+    # Max similarity per domain equals the best of any top-k phrase ranking
+    best_domain = max(domain_scores, key=domain_scores.get)
+    max_score = domain_scores[best_domain]
+
     if max_score >= threshold:
         return best_domain
 
-    guessed_intent = classify_intent(normalized_msg)
+    # The turn's own intent classification is counted in cascade_stats; this fallback isn't
+    guessed_intent = shared.intent if shared else classify_intent(normalized_msg, record=False)
     fallback_map = {
         "order_food": "food", "find_restaurant": "food",
         "book_hotel": "travel", "book_flight": "travel",
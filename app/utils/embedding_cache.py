@@ -0,0 +1,145 @@
+# app/utils/embedding_cache.py
+
+import os
+import re
+import atexit
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from app.utils.model_registry import get_encoder, encoder_key, MULTILINGUAL_MODEL
+
+EMBEDDING_CACHE_MB = float(os.getenv("EMBEDDING_CACHE_MB", "64"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")  # e.g. model/embedding_cache.pkl
+
+# Rough per-entry cost of the key tuple and OrderedDict slot on top of the vector itself
+ENTRY_OVERHEAD_BYTES = 200
+# Bumped when saved vectors stop matching what cached_encode() would compute (2: the caller's text is encoded)
+SNAPSHOT_FORMAT = 2
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """LRU cache of embeddings keyed on (model, normalized text), bounded by memory."""
+
+    def __init__(self, max_bytes: int, path: str = ""):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector: np.ndarray) -> None:
+        key = (model_name, text)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes + ENTRY_OVERHEAD_BYTES
+            self._entries[key] = vector
+            self._bytes += vector.nbytes + ENTRY_OVERHEAD_BYTES
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_mb": round(self._bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def save(self, path: str = "") -> None:
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            snapshot = list(self._entries.items())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"format": SNAPSHOT_FORMAT, "entries": snapshot}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"[EmbeddingCache] 💾 Saved {len(snapshot)} embeddings to {path}")
+
+    def load(self, path: str = "") -> None:
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+            if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+                print(f"[EmbeddingCache] ⚠️ Ignoring {path}: saved by an older version")
+                return
+            for (model_name, text), vector in snapshot["entries"]:
+                self.put(model_name, text, vector)
+            print(f"[EmbeddingCache] ✅ Loaded {len(self._entries)} embeddings from {path}")
+        except Exception as e:
+            print(f"[EmbeddingCache] ⚠️ Could not load {path}: {e}")
+
+
+embedding_cache = EmbeddingCache(int(EMBEDDING_CACHE_MB * 1024 * 1024), EMBEDDING_CACHE_PATH)
+
+if EMBEDDING_CACHE_PATH:
+    embedding_cache.load()
+    atexit.register(embedding_cache.save)
+
+
+def cached_encode(texts: Union[str, List[str]], model_name: str = MULTILINGUAL_MODEL) -> np.ndarray:
+    """Encode one text (1-D result) or a list of texts (2-D result), encoding only cache misses.
+
+    Lookups use the normalized text, but the encoder sees the caller's text: the multilingual
+    model is case-sensitive, and documents are encoded from their raw content.
+    """
+    single = isinstance(texts, str)
+    texts = [texts] if single else list(texts)
+    keys = [normalize_text(t) for t in texts]
+    cache_model = encoder_key(model_name)
+
+    vectors = [embedding_cache.get(cache_model, key) for key in keys]
+    missing: Dict[str, str] = {}  # key -> first spelling asked for
+    for key, text, vec in zip(keys, texts, vectors):
+        if vec is None:
+            missing.setdefault(key, text)
+    if missing:
+        encoded = np.asarray(get_encoder(model_name).encode(list(missing.values()), convert_to_numpy=True),
+                             dtype=np.float32)
+        # Copies, so a cached row doesn't keep the whole batch buffer alive behind its nbytes
+        fresh = {key: np.array(row, copy=True) for key, row in zip(missing, encoded)}
+        for key, vector in fresh.items():
+            embedding_cache.put(cache_model, key, vector)
+        vectors = [vec if vec is not None else fresh[key] for key, vec in zip(keys, vectors)]
+
+    if single:
+        return vectors[0]
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(vectors)
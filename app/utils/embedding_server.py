@@ -0,0 +1,95 @@
+# app/utils/embedding_server.py
+
+import os
+import json
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import numpy as np
+
+from app.utils import model_registry
+from app.utils.embedding_cache import cached_encode, embedding_cache
+from app.utils.remote_encoder import MAX_TEXTS_PER_REQUEST
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    """POST /encode {"model", "texts"} -> little-endian float32 rows; GET /status -> JSON."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: bytes, content_type: str, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, obj):
+        self._send(status, json.dumps(obj).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        if self.path != "/status":
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, {"models": model_registry.memory_report(), "embedding_cache": embedding_cache.stats()})
+
+    def do_POST(self):
+        if self.path != "/encode":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            texts = request["texts"]
+            model_name = request.get("model", model_registry.MULTILINGUAL_MODEL)
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send_json(400, {"error": f"bad request: {e}"})
+        if not isinstance(texts, list) or len(texts) > MAX_TEXTS_PER_REQUEST:
+            return self._send_json(400, {"error": f"texts must be a list of at most {MAX_TEXTS_PER_REQUEST} strings"})
+
+        try:
+            # Handler threads meet in the shared cache and the micro-batching encoder
+            vectors = np.atleast_2d(cached_encode(texts, model_name)).astype("<f4", copy=False)
+        except Exception as e:
+            print(f"[EmbeddingServer] ❌ Encode failed: {e}")
+            return self._send_json(500, {"error": str(e)})
+
+        rows, dim = vectors.shape
+        self._send(200, vectors.tobytes(), "application/octet-stream", {"X-Rows": str(rows), "X-Dim": str(dim)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # Unix socket peers have no (host, port), which the request handler expects
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(url: str):
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        if os.path.exists(parsed.path):
+            os.remove(parsed.path)
+        server = ThreadingUnixHTTPServer(parsed.path, EmbeddingRequestHandler)
+        os.chmod(parsed.path, 0o660)
+        return server
+    return ThreadingHTTPServer((parsed.hostname or "127.0.0.1", parsed.port or 8765), EmbeddingRequestHandler)
+
+
+def serve(url: str, preload=()):
+    # This process does the encoding; never forward to another server
+    model_registry.EMBEDDING_SERVER_URL = ""
+    for model_name in preload:
+        model_registry.get_encoder(model_name)
+
+    server = make_server(url)
+    print(f"[EmbeddingServer] ✅ Serving {model_registry.ENCODER_BACKEND} encoders on {url}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,93 @@
+# app/utils/encode_batcher.py
+
+import time
+import queue
+import threading
+from typing import Dict, List, Union
+
+import numpy as np
+
+
+class _EncodeRequest:
+    __slots__ = ("texts", "result", "error", "done")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchingEncoder:
+    """Collects encode() calls from concurrent threads and runs them as one batch.
+
+    A background thread waits up to `window_ms` after the first queued request
+    (or until `max_batch` texts are pending), encodes everything in a single
+    forward pass and hands each caller its own rows.
+    """
+
+    def __init__(self, encoder, window_ms: float = 3.0, max_batch: int = 64):
+        self.encoder = encoder
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.batches = 0
+        self.batched_texts = 0
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._worker.start()
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if len(texts) >= self.max_batch:
+            # Already a full batch on its own; no point waiting for company
+            return np.asarray(self.encoder.encode(sentences, convert_to_numpy=True))
+
+        request = _EncodeRequest(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result[0] if single else request.result
+
+    def _collect(self) -> List[_EncodeRequest]:
+        batch = [self._queue.get()]
+        pending = len(batch[0].texts)
+        deadline = time.perf_counter() + self.window
+        while pending < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            pending += len(request.texts)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = np.asarray(self.encoder.encode(texts, convert_to_numpy=True, batch_size=len(texts)))
+                offset = 0
+                for request in batch:
+                    request.result = vectors[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                self.batches += 1
+                self.batched_texts += len(texts)
+                for request in batch:
+                    request.done.set()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "texts": self.batched_texts,
+            "mean_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+        }
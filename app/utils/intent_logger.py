@@ -2,11 +2,19 @@
 
 from rdflib import Namespace, URIRef, Literal
 from app.utils.user_graph import user_graph
+from app.intents.intent_classifier import intent_domains
+import os
+import json
 import uuid
 import datetime
+import threading
 
 LOG = Namespace("http://example.org/log/")
 
+# JSONL file of (text, domain, intent) turns used to retrain the intent head; disabled when empty
+INTENT_TRAFFIC_LOG = os.getenv("INTENT_TRAFFIC_LOG", "")
+_traffic_lock = threading.Lock()
+
 user_graph.bind("log", LOG)
 
 
@@ -29,3 +37,25 @@ def log_intent_action(user_id: str, domain: str, intent: str, slots: dict):
 
 def export_intent_logs(path="data/intent_logs.ttl"):
     user_graph.serialize(destination=path, format="turtle")
+
+
+def log_labelled_turn(message: str, intent: str, verified: bool = False):
+    """Append a turn for retraining. The domain label follows from the intent, not the session.
+
+    Intents the classifier predicted itself are unverified: training leaves them out unless
+    asked to, so the head doesn't learn from its own output. Pass `verified` for labels a
+    user confirmed or chose explicitly.
+    """
+    if not INTENT_TRAFFIC_LOG:
+        return
+    record = {
+        "text": message,
+        "domain": intent_domains.get(intent),
+        "intent": intent,
+        "verified": verified,
+        "timestamp": datetime.datetime.now().isoformat(),
+    }
+    with _traffic_lock:
+        os.makedirs(os.path.dirname(INTENT_TRAFFIC_LOG) or ".", exist_ok=True)
+        with open(INTENT_TRAFFIC_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,82 @@
+# app/utils/keyword_matcher.py
+
+from collections import deque
+from typing import Dict, List, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over labelled keywords.
+
+    Built once from {label: [keyword, ...]}; `find()` reports every keyword
+    occurrence in a single pass over the text, independent of how many
+    keywords were compiled in.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]], word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+
+        for label, words in keywords.items():
+            for word in words:
+                self._add(word.lower(), label)
+        self._link()
+
+    def _add(self, word: str, label: str) -> None:
+        if not word:
+            return
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        if (word, label) not in self._out[state]:
+            self._out[state].append((word, label))
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _at_boundary(self, text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not before.isalnum() and not after.isalnum()
+
+    def find(self, text: str) -> List[Tuple[str, str, int, int]]:
+        """Return (keyword, label, start, end) for every match in `text`, in order of end position."""
+        text = text.lower()
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for word, label in self._out[state]:
+                start, end = i - len(word) + 1, i + 1
+                if self.word_boundary and not self._at_boundary(text, start, end):
+                    continue
+                matches.append((word, label, start, end))
+        return matches
+
+    def labels(self, text: str) -> Dict[str, List[str]]:
+        """Return {label: [distinct matched keywords]} for `text`."""
+        found: Dict[str, List[str]] = {}
+        for word, label, _, _ in self.find(text):
+            words = found.setdefault(label, [])
+            if word not in words:
+                words.append(word)
+        return found
@@ -0,0 +1,137 @@
+# app/utils/model_registry.py
+
+import os
+import time
+import threading
+from typing import Dict, Any, Tuple
+
+MULTILINGUAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+ENGLISH_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "torch" (SentenceTransformer), "onnx" (ONNX Runtime, int8) or "onnx-fp32"
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch").lower()
+
+# Cross-request micro-batching; a window of 0 disables it
+ENCODE_BATCH_WINDOW_MS = float(os.getenv("ENCODE_BATCH_WINDOW_MS", "3"))
+ENCODE_MAX_BATCH = int(os.getenv("ENCODE_MAX_BATCH", "64"))
+
+# e.g. unix:///tmp/localloop-embed.sock or http://127.0.0.1:8765; when set, encoding is
+# delegated to scripts/run_embedding_server.py and no model is loaded in this process
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL", "")
+
+_encoders: Dict[Tuple[str, str], Any] = {}
+_batchers: Dict[Tuple[str, str], Any] = {}
+_load_seconds: Dict[Tuple[str, str], float] = {}
+_resolved: Dict[Tuple[str, str], str] = {}
+_lock = threading.Lock()
+
+
+def _resolve_backend(model_name: str, backend: str) -> str:
+    """The backend that will actually encode for `model_name`: ONNX falls back to torch without an export."""
+    key = (model_name, backend)
+    if key not in _resolved:
+        resolved = backend
+        if backend.startswith("onnx"):
+            from app.utils.onnx_encoder import has_onnx_export
+
+            if not has_onnx_export(model_name, quantized=backend == "onnx"):
+                print(f"[Models] ⚠️ No {backend} export for {model_name}, falling back to torch. "
+                      f"Run scripts/export_onnx_encoder.py first.")
+                resolved = "torch"
+        _resolved[key] = resolved
+    return _resolved[key]
+
+
+def _load(model_name: str, backend: str):
+    if backend == "remote":
+        from app.utils.remote_encoder import RemoteEncoder
+
+        return RemoteEncoder(model_name, EMBEDDING_SERVER_URL)
+    if backend.startswith("onnx"):
+        from app.utils.onnx_encoder import OnnxEncoder
+
+        return OnnxEncoder(model_name, quantized=backend == "onnx")
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def get_encoder(model_name: str = MULTILINGUAL_MODEL, backend: str = None, batched: bool = True):
+    """Return the process-wide encoder for `model_name`, loading it on first use.
+
+    With `batched` (and a non-zero ENCODE_BATCH_WINDOW_MS) the encoder is wrapped
+    so concurrent callers share forward passes; pass `batched=False` for the raw
+    model, e.g. for export or benchmarking. Unless a `backend` is forced, an
+    EMBEDDING_SERVER_URL routes encoding to the shared embedding server.
+    """
+    key = (model_name, backend or ("remote" if EMBEDDING_SERVER_URL else ENCODER_BACKEND))
+    # A remote encoder is batched by the server, across all workers
+    use_batcher = batched and ENCODE_BATCH_WINDOW_MS > 0 and key[1] != "remote"
+    encoder = (_batchers if use_batcher else _encoders).get(key)
+    if encoder is not None:
+        return encoder
+
+    with _lock:
+        if key not in _encoders:
+            resolved = _resolve_backend(*key)
+            start = time.perf_counter()
+            _encoders[key] = _load(model_name, resolved)
+            _load_seconds[key] = time.perf_counter() - start
+            print(f"[Models] ✅ Loaded {model_name} ({resolved}) in {_load_seconds[key]:.1f}s")
+        if not use_batcher:
+            return _encoders[key]
+        if key not in _batchers:
+            from app.utils.encode_batcher import BatchingEncoder
+
+            _batchers[key] = BatchingEncoder(_encoders[key], ENCODE_BATCH_WINDOW_MS, ENCODE_MAX_BATCH)
+        return _batchers[key]
+
+
+def encoder_key(model_name: str = MULTILINGUAL_MODEL) -> str:
+    """Identify the vectors produced for `model_name` by the backend that actually encodes them."""
+    # The embedding server runs with the same ENCODER_BACKEND and applies the same fallback itself
+    backend = ENCODER_BACKEND if EMBEDDING_SERVER_URL else _resolve_backend(model_name, ENCODER_BACKEND)
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def _model_bytes(encoder) -> int:
+    if hasattr(encoder, "weights_bytes"):
+        return encoder.weights_bytes
+    try:
+        tensors = list(encoder.parameters()) + list(encoder.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+def loaded_models() -> Dict[str, Dict[str, Any]]:
+    return {
+        f"{name}@{backend}": {
+            "backend": type(encoder).__name__,
+            "load_seconds": round(_load_seconds.get((name, backend), 0.0), 2),
+            "weights_mb": round(_model_bytes(encoder) / (1024 * 1024), 1),
+            "batching": _batchers[(name, backend)].stats() if (name, backend) in _batchers else None,
+        }
+        for (name, backend), encoder in _encoders.items()
+    }
+
+
+def memory_report() -> Dict[str, Any]:
+    models = loaded_models()
+    return {
+        "encoder_backend": ENCODER_BACKEND,
+        "embedding_server": EMBEDDING_SERVER_URL or None,
+        "encoders": models,
+        "encoder_weights_mb": round(sum(m["weights_mb"] for m in models.values()), 1),
+        "process_rss_mb": round(_current_rss_bytes() / (1024 * 1024), 1),
+    }
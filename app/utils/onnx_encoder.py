@@ -0,0 +1,78 @@
+# app/utils/onnx_encoder.py
+
+import os
+import json
+from typing import List, Union
+
+import numpy as np
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "model/onnx")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+CONFIG_FILE = "encoder_config.json"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+
+
+def onnx_model_dir(model_name: str) -> str:
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+
+
+def has_onnx_export(model_name: str, quantized: bool = True) -> bool:
+    model_dir = onnx_model_dir(model_name)
+    weights = INT8_FILE if quantized else FP32_FILE
+    return os.path.exists(os.path.join(model_dir, CONFIG_FILE)) and os.path.exists(os.path.join(model_dir, weights))
+
+
+class OnnxEncoder:
+    """SentenceTransformer-compatible `encode()` backed by an ONNX Runtime CPU session.
+
+    Loads an export written by scripts/export_onnx_encoder.py and reproduces the
+    mean pooling (and optional normalization) of the original model, so it can
+    stand in for the PyTorch encoder without importing torch.
+    """
+
+    def __init__(self, model_name: str, quantized: bool = True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = onnx_model_dir(model_name)
+        with open(os.path.join(model_dir, CONFIG_FILE), "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        self.model_name = model_name
+        self.max_seq_length = config.get("max_seq_length", 128)
+        self.normalize = config.get("normalize", False)
+        self.weights_path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = ONNX_THREADS
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.weights_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @property
+    def weights_bytes(self) -> int:
+        return os.path.getsize(self.weights_path)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np",
+            )
+            feeds = {name: value.astype(np.int64) for name, value in tokens.items() if name in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+
+        vectors = np.vstack(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        return vectors[0] if single else vectors
@@ -0,0 +1,143 @@
+# app/utils/phrase_bank.py
+
+import os
+import glob
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.model_registry import encoder_key, MULTILINGUAL_MODEL
+from app.utils.embedding_cache import cached_encode
+
+PHRASE_BANK_DIR = os.getenv("PHRASE_BANK_DIR", "model/phrase_bank")
+ARTIFACT_VERSION = 2  # 2: phrases encoded as written, not lowercased
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _digest(model_name: str, segment: str, groups: Dict[str, List[str]]) -> str:
+    payload = json.dumps(
+        [ARTIFACT_VERSION, model_name, segment, [[label, phrases] for label, phrases in groups.items()]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class PhraseBank:
+    """All reference phrases stacked in one normalized matrix.
+
+    Phrases are registered per segment (reset, followup, domain, intent), each
+    split into labelled groups. `match()` scores a message against every phrase
+    with a single matrix-vector product and reduces the scores to the max per
+    group, so the cost does not depend on how many intents or examples exist.
+
+    Segment embeddings are memory-mapped from `PHRASE_BANK_DIR` when an artifact
+    with the same model and phrase hash exists (see
+    scripts/build_phrase_embeddings.py); otherwise they are encoded on the spot.
+    """
+
+    def __init__(self, model_name: str = MULTILINGUAL_MODEL, artifact_dir: str = PHRASE_BANK_DIR):
+        self.model_name = model_name
+        self.artifact_dir = artifact_dir
+        self._segments: Dict[str, Dict[str, np.ndarray]] = {}
+        self._digests: Dict[str, str] = {}
+        self._matrix = None
+        self._offsets = None
+        self._group_keys = []
+        self._lock = threading.Lock()
+
+    def register(self, segment: str, groups: Dict[str, List[str]]) -> None:
+        groups = {label: list(phrases) for label, phrases in groups.items() if phrases}
+        phrases = [phrase for group in groups.values() for phrase in group]
+        digest = _digest(encoder_key(self.model_name), segment, groups)
+
+        matrix = self._load_artifact(segment, digest, len(phrases))
+        if matrix is None:
+            print(f"[PhraseBank] ⚠️ No artifact for '{segment}' ({digest}), encoding {len(phrases)} phrases")
+            matrix = _normalize_rows(cached_encode(phrases, self.model_name))
+
+        embedded, start = {}, 0
+        for label, group in groups.items():
+            embedded[label] = matrix[start:start + len(group)]
+            start += len(group)
+
+        with self._lock:
+            self._segments[segment] = embedded
+            self._digests[segment] = digest
+            self._matrix = None
+
+    def _artifact_path(self, segment: str, digest: str) -> str:
+        return os.path.join(self.artifact_dir, f"{segment}-{digest}.npy")
+
+    def _load_artifact(self, segment: str, digest: str, rows: int) -> Optional[np.ndarray]:
+        path = self._artifact_path(segment, digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.ndim != 2 or matrix.shape[0] != rows:
+                print(f"[PhraseBank] ⚠️ {path} has shape {matrix.shape}, expected {rows} rows")
+                return None
+            return matrix
+        except Exception as e:
+            print(f"[PhraseBank] ⚠️ Could not load {path}: {e}")
+            return None
+
+    def save_artifacts(self) -> List[str]:
+        """Write every registered segment to disk and drop artifacts of outdated phrase lists."""
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        with self._lock:
+            segments = dict(self._segments)
+            digests = dict(self._digests)
+
+        written = []
+        for segment, groups in segments.items():
+            path = self._artifact_path(segment, digests[segment])
+            matrix = np.ascontiguousarray(np.vstack(list(groups.values())), dtype=np.float32)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, matrix)
+            os.replace(tmp_path, path)
+            written.append(path)
+
+            for stale in glob.glob(os.path.join(self.artifact_dir, f"{segment}-*.npy")):
+                if stale != path:
+                    os.remove(stale)
+        return written
+
+    def _compile(self) -> None:
+        blocks, offsets, keys = [], [], []
+        row = 0
+        for segment, groups in self._segments.items():
+            for label, vectors in groups.items():
+                blocks.append(vectors)
+                offsets.append(row)
+                keys.append((segment, label))
+                row += len(vectors)
+        self._matrix = np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._group_keys = keys
+
+    def match(self, vector: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """Return {segment: {label: max cosine similarity}} for one message embedding."""
+        with self._lock:
+            if self._matrix is None:
+                self._compile()
+            matrix, offsets, keys = self._matrix, self._offsets, self._group_keys
+
+        query = _normalize_rows(np.asarray(vector, dtype=np.float32).reshape(-1))
+        group_max = np.maximum.reduceat(matrix @ query, offsets)
+
+        scores: Dict[str, Dict[str, float]] = {}
+        for (segment, label), score in zip(keys, group_max.tolist()):
+            scores.setdefault(segment, {})[label] = score
+        return scores
+
+
+phrase_bank = PhraseBank()
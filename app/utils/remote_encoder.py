@@ -0,0 +1,86 @@
+# app/utils/remote_encoder.py
+
+import json
+import socket
+import threading
+import http.client
+from typing import List, Union
+from urllib.parse import urlparse
+
+import numpy as np
+
+ENCODE_PATH = "/encode"
+REQUEST_TIMEOUT_S = 30
+MAX_TEXTS_PER_REQUEST = 1024  # larger requests are rejected by the server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connect(url: str, timeout: float) -> http.client.HTTPConnection:
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return _UnixHTTPConnection(parsed.path, timeout)
+    return http.client.HTTPConnection(parsed.hostname or "127.0.0.1", parsed.port or 80, timeout=timeout)
+
+
+class RemoteEncoder:
+    """SentenceTransformer-compatible `encode()` served by scripts/run_embedding_server.py.
+
+    Lets a worker use the host's shared encoder without loading torch or any
+    model weights itself. Each thread keeps its own keep-alive connection.
+    """
+
+    weights_bytes = 0
+
+    def __init__(self, model_name: str, url: str):
+        self.model_name = model_name
+        self.url = url
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = _connect(self.url, REQUEST_TIMEOUT_S)
+        return self._local.conn
+
+    def _post(self, body: bytes) -> http.client.HTTPResponse:
+        # One retry covers a keep-alive connection the server has since closed
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", ENCODE_PATH, body=body, headers={"Content-Type": "application/json"})
+                return conn.getresponse()
+            except (ConnectionError, http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise RuntimeError(f"Embedding server unavailable at {self.url}: {e}") from e
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        chunk = max(1, min(batch_size, MAX_TEXTS_PER_REQUEST))
+        vectors = np.concatenate([self._encode_chunk(texts[i:i + chunk]) for i in range(0, len(texts), chunk)]) \
+            if texts else np.empty((0, 0), dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
+
+    def _encode_chunk(self, texts: List[str]) -> np.ndarray:
+        response = self._post(json.dumps({"model": self.model_name, "texts": texts}).encode("utf-8"))
+        payload = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Embedding server error {response.status}: {payload.decode('utf-8', 'replace')}")
+
+        rows, dim = int(response.getheader("X-Rows")), int(response.getheader("X-Dim"))
+        return np.frombuffer(payload, dtype="<f4").reshape(rows, dim).copy()
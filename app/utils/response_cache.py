@@ -0,0 +1,143 @@
+# app/utils/response_cache.py
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+# Rough per-entry cost of the key, expiry and OrderedDict slot on top of the response text
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class ResponseCache:
+    """LLM responses reused until their TTL expires, in two tiers.
+
+    The exact tier is an LRU keyed on a hash of (model, temperature, prompt) and bounded by
+    memory. The semantic tier keeps, per bucket (model, temperature, call site), the embedding
+    of a short caller-chosen key and answers a lookup whose embedding is at least
+    `min_similarity` (cosine) close to a live entry.
+    """
+
+    def __init__(self, max_bytes: int, max_semantic_entries: int, min_similarity: float):
+        self.max_bytes = max_bytes
+        self.max_semantic_entries = max_semantic_entries
+        self.min_similarity = min_similarity
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.miss_seconds = 0.0
+        self.tokens_saved = 0
+        self._bytes = 0
+        self._exact: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, response, tokens)
+        self._semantic: "OrderedDict[Hashable, list]" = OrderedDict()  # bucket -> [(vector, response, expires_at, tokens)]
+        self._semantic_size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _cost(key: str, response: str) -> int:
+        return len(key) + len(response.encode("utf-8")) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            expires_at, response, tokens = entry
+            if expires_at <= time.time():
+                del self._exact[key]
+                self._bytes -= self._cost(key, response)
+                return None
+            self._exact.move_to_end(key)
+            self.exact_hits += 1
+            self.tokens_saved += tokens
+            return response
+
+    def get_similar(self, bucket: Hashable, vector: np.ndarray) -> Optional[str]:
+        vector = _unit(vector)
+        now = time.time()
+        with self._lock:
+            entries = self._semantic.get(bucket)
+            if not entries:
+                return None
+            live = [entry for entry in entries if entry[2] > now]
+            self._semantic_size -= len(entries) - len(live)
+            if not live:
+                del self._semantic[bucket]
+                return None
+            self._semantic[bucket] = live
+            scores = np.stack([entry[0] for entry in live]).astype(np.float32) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.min_similarity:
+                return None
+            self._semantic.move_to_end(bucket)
+            self.semantic_hits += 1
+            self.tokens_saved += live[best][3]
+            return live[best][1]
+
+    def put(self, key: str, response: str, ttl: float, seconds: float, tokens: int,
+            bucket: Hashable = None, vector: Optional[np.ndarray] = None) -> None:
+        """Store the response of a miss that took `seconds` and used `tokens`; also in the
+        semantic tier when `vector` is given."""
+        expires_at = time.time() + ttl
+        with self._lock:
+            self.misses += 1
+            self.miss_seconds += seconds
+            if ttl <= 0:
+                return
+            old = self._exact.pop(key, None)
+            if old is not None:
+                self._bytes -= self._cost(key, old[1])
+            self._exact[key] = (expires_at, response, tokens)
+            self._bytes += self._cost(key, response)
+            while self._bytes > self.max_bytes and self._exact:
+                evicted_key, (_, evicted, _) = self._exact.popitem(last=False)
+                self._bytes -= self._cost(evicted_key, evicted)
+
+            if vector is None or not self.max_semantic_entries:
+                return
+            self._semantic.setdefault(bucket, []).append((_unit(vector).astype(np.float16), response, expires_at, tokens))
+            self._semantic.move_to_end(bucket)
+            self._semantic_size += 1
+            while self._semantic_size > self.max_semantic_entries:
+                oldest_bucket, entries = next(iter(self._semantic.items()))
+                if entries:
+                    entries.pop(0)
+                    self._semantic_size -= 1
+                if not entries:
+                    del self._semantic[oldest_bucket]
+
+    def bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self, usd_per_million_tokens: float = 0.0) -> Dict[str, float]:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        avg_miss_ms = 1000 * self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "entries": len(self._exact),
+            "semantic_entries": self._semantic_size,
+            "size_mb": round(self._bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "personal_bypassed": self.bypassed,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "avg_llm_ms": round(avg_miss_ms, 1),
+            "saved_ms": round(hits * avg_miss_ms, 1),
+            "saved_tokens": self.tokens_saved,
+            "saved_usd": round(self.tokens_saved * usd_per_million_tokens / 1e6, 4),
+        }
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
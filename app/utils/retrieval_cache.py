@@ -0,0 +1,139 @@
+# app/utils/retrieval_cache.py
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+def _elapsed(started: float) -> float:
+    return time.perf_counter() - started
+
+
+class _Bucket:
+    """Cached queries sharing one (index version, partitions, filters) key.
+
+    Unit vectors live in a preallocated matrix that grows by doubling; a put writes one row
+    and an eviction moves the last row into the freed slot, so lookups never re-stack.
+    """
+
+    def __init__(self):
+        self.entries: "OrderedDict[int, list]" = OrderedDict()  # seq -> results, oldest first
+        self.matrix: Optional[np.ndarray] = None
+        self.row_of: Dict[int, int] = {}
+        self.seq_at: List[int] = []
+
+    def add(self, seq: int, vector: np.ndarray, results: List[str]) -> None:
+        if self.matrix is None:
+            self.matrix = np.empty((8, len(vector)), dtype=np.float32)
+        elif len(self.seq_at) == len(self.matrix):
+            grown = np.empty((2 * len(self.matrix), self.matrix.shape[1]), dtype=np.float32)
+            grown[:len(self.matrix)] = self.matrix
+            self.matrix = grown
+        row = len(self.seq_at)
+        self.matrix[row] = vector
+        self.row_of[seq] = row
+        self.seq_at.append(seq)
+        self.entries[seq] = results
+
+    def pop_oldest(self) -> None:
+        seq, _ = self.entries.popitem(last=False)
+        row, last = self.row_of.pop(seq), len(self.seq_at) - 1
+        if row != last:
+            moved = self.seq_at[last]
+            self.matrix[row] = self.matrix[last]
+            self.seq_at[row] = moved
+            self.row_of[moved] = row
+        self.seq_at.pop()
+
+    def nearest(self, vector: np.ndarray):
+        scores = self.matrix[:len(self.seq_at)] @ vector
+        row = int(np.argmax(scores))
+        return self.seq_at[row], float(scores[row])
+
+
+class RetrievalCache:
+    """LRU of retrieve() results.
+
+    Entries are grouped by an exact key (index version, partitions, filters); within a group
+    a query hits when its embedding is within `min_similarity` (cosine) of a cached one, so
+    "sushi jakarta" and "sushi di jakarta" share an entry. Rounding or hashing the vectors
+    instead would miss whenever a near-identical phrasing lands across a bucket boundary.
+    """
+
+    def __init__(self, max_entries: int, min_similarity: float):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.hit_seconds = 0.0
+        self._size = 0
+        self._seq = 0
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, key: Hashable, vector: np.ndarray, started: float) -> Optional[List[str]]:
+        """Cached results for `key` and a query close to `vector`; `started` is the perf_counter() at lookup."""
+        if not self.max_entries:
+            return None
+        vector = self._unit(vector)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                seq, similarity = bucket.nearest(vector)
+                if similarity >= self.min_similarity:
+                    self._buckets.move_to_end(key)
+                    bucket.entries.move_to_end(seq)
+                    self.hits += 1
+                    self.hit_seconds += _elapsed(started)
+                    return list(bucket.entries[seq])
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, vector: np.ndarray, results: List[str], seconds: float) -> None:
+        """Store the results of a miss that took `seconds` to compute."""
+        if not self.max_entries:
+            return
+        vector = self._unit(vector)
+        with self._lock:
+            self.miss_seconds += seconds
+            bucket = self._buckets.setdefault(key, _Bucket())
+            self._buckets.move_to_end(key)
+            self._seq += 1
+            bucket.add(self._seq, vector, list(results))
+            self._size += 1
+            while self._size > self.max_entries:
+                oldest_key, oldest = next(iter(self._buckets.items()))
+                oldest.pop_oldest()
+                self._size -= 1
+                if not oldest.entries:
+                    del self._buckets[oldest_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        avg_miss_ms = 1000 * self.miss_seconds / self.misses if self.misses else 0.0
+        avg_hit_ms = 1000 * self.hit_seconds / self.hits if self.hits else 0.0
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "avg_miss_ms": round(avg_miss_ms, 3),
+            "avg_hit_ms": round(avg_hit_ms, 3),
+            "saved_ms": round(self.hits * (avg_miss_ms - avg_hit_ms), 1),
+        }
+
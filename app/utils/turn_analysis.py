@@ -0,0 +1,63 @@
+# app/utils/turn_analysis.py
+
+from functools import cached_property
+from typing import Optional
+
+from app.lang_detect import detect_language
+from app.utils.embedding_cache import cached_encode
+from app.utils.phrase_bank import phrase_bank
+from app.utils.domain_detector import detect_domain
+from app.intents.intent_classifier import classify_intent
+from app.intents.intent_head import has_intent_head, predict_heads
+from app.intents.lexical_classifier import lexical_predict, is_confident
+from app.task_flow import task_flow_stages
+
+
+class TurnAnalysis:
+    """Signals derived from one user message, each computed at most once per turn.
+
+    Everything is lazy: when the lexical stage is confident about the intent,
+    the embedding is never computed for classification.
+    """
+
+    def __init__(self, message: str, mode: str = "text"):
+        self.message = message
+        self.mode = mode
+        self.normalized = message.strip().lower()
+
+    @cached_property
+    def lexical(self) -> Optional[dict]:
+        return lexical_predict(self.normalized)
+
+    @cached_property
+    def lexically_resolved(self) -> bool:
+        return is_confident(self.lexical, "intent")
+
+    @cached_property
+    def embedding(self):
+        # The cased text, like the RAG documents; the cache still keys it on the normalized form
+        return cached_encode(self.message.strip())
+
+    @cached_property
+    def phrase_scores(self):
+        return phrase_bank.match(self.embedding)
+
+    @cached_property
+    def head_prediction(self) -> Optional[dict]:
+        return predict_heads(self.embedding)[0] if has_intent_head() else None
+
+    @cached_property
+    def lang(self) -> str:
+        return detect_language(self.message)
+
+    @cached_property
+    def intent(self) -> Optional[str]:
+        return classify_intent(self.normalized, mode=self.mode, analysis=self)
+
+    @cached_property
+    def domain(self) -> str:
+        return detect_domain(self.message, analysis=self)
+
+    @cached_property
+    def stage(self) -> str:
+        return task_flow_stages.get(self.intent, "search")
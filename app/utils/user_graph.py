@@ -19,17 +19,34 @@ def init_graph():
     user_graph.add((user, RDF.type, FOAF.Person))
     user_graph.add((user, FOAF.name, Literal("Budi")))
     user_graph.add((user, PREF.likes, Literal("makanan jepang")))
+    user_graph.add((user, _domain_predicate("food"), Literal("makanan jepang")))
     user_graph.add((user, PREF.likes, Literal("elektronik")))
+    user_graph.add((user, _domain_predicate("marketplace"), Literal("elektronik")))
     user_graph.add((user, PREF.recent_search, Literal("kamera mirrorless")))
     user_graph.add((user, PREF.recent_search, Literal("promo nasi goreng")))
     user_graph.add((user, PREF.language, Literal("id")))
+    backfill_preference_domains()
 
 def _get_user_uri(user_id: str):
     return URIRef(f"http://example.org/{user_id}")
 
+def _domain_predicate(domain: str):
+    # Preferences are also indexed per domain (pref:likes_food, ...) so lookups by domain are one triple scan
+    return PREF[f"likes_{domain}"]
 
-def get_user_preference_tags(user_id: str):
+def _is_domain_predicate(predicate) -> bool:
+    return str(predicate).startswith(str(PREF.likes) + "_")
+
+def _preference_domain(preference: str) -> str:
+    from app.utils.domain_detector import detect_domain
+
+    return detect_domain(preference, threshold=0.55, top_k=1, record=False)
+
+
+def get_user_preference_tags(user_id: str, domain: str = None):
     user_uri = _get_user_uri(user_id)
+    if domain:
+        return [str(pref).lower() for pref in user_graph.objects(user_uri, _domain_predicate(domain))]
     query = f"""
     SELECT ?pref WHERE {{
         <{user_uri}> <{PREF.likes}> ?pref .
@@ -48,10 +65,31 @@ def get_recent_searches(user_id: str):
     results = user_graph.query(query)
     return [str(row.search) for row in results]
 
-def add_user_preference(user_id: str, preference: str):
+def has_user_preference(user_id: str, preference: str) -> bool:
+    return (_get_user_uri(user_id), PREF.likes, Literal(preference.lower())) in user_graph
+
+def has_preference_domain(user_id: str, preference: str) -> bool:
+    literal = Literal(preference.lower())
+    return any(_is_domain_predicate(p) for p in user_graph.predicates(_get_user_uri(user_id), literal))
+
+def add_user_preference(user_id: str, preference: str, domain: str = None):
+    """Store a preference with its pref:likes_<domain> label, detecting the domain when none is given."""
     user_uri = _get_user_uri(user_id)
-    if preference.lower() not in get_user_preference_tags(user_id):
-        user_graph.add((user_uri, PREF.likes, Literal(preference.lower())))
+    literal = Literal(preference.lower())
+    if not has_user_preference(user_id, preference):
+        user_graph.add((user_uri, PREF.likes, literal))
+    if domain or not has_preference_domain(user_id, preference):
+        user_graph.add((user_uri, _domain_predicate(domain or _preference_domain(preference)), literal))
+
+def backfill_preference_domains() -> int:
+    """Label preferences stored before domains were recorded; returns how many were labelled."""
+    unlabelled = [(user_uri, pref) for user_uri, pref in user_graph.subject_objects(PREF.likes)
+                  if not any(_is_domain_predicate(p) for p in user_graph.predicates(user_uri, pref))]
+    for user_uri, pref in unlabelled:
+        user_graph.add((user_uri, _domain_predicate(_preference_domain(str(pref))), pref))
+    if unlabelled:
+        print(f"[✅] Labelled {len(unlabelled)} preferences with their domain")
+    return len(unlabelled)
 
 def add_recent_search(user_id: str, search_query: str):
     user_uri = _get_user_uri(user_id)
@@ -0,0 +1,127 @@
+# scripts/benchmark_ann.py
+
+import os
+import sys
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ann_index import build_params, make_index, set_search_params, index_bytes, index_kind
+
+
+
+def synthetic_corpus(n: int, queries: int, dim: int, seed: int = 0):
+    """Clustered unit vectors (topics with spread), closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 16), dim)).astype(np.float32)
+    corpus = centers[rng.integers(len(centers), size=n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    picks = corpus[rng.integers(n, size=queries)]
+    query_set = picks + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    for matrix in (corpus, query_set):
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return corpus, query_set
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def search(index, corpus: np.ndarray, queries: np.ndarray, k: int, rerank: int = 0) -> np.ndarray:
+    """Top-k ids; with `rerank`, the top `rerank` candidates are re-scored against full-precision vectors."""
+    if not rerank:
+        return index.search(queries, k)[1]
+    _, candidates = index.search(queries, max(k, rerank))
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for row, (q, ids) in enumerate(zip(queries, candidates)):
+        ids = ids[ids >= 0]
+        found[row] = ids[np.argsort(-(corpus[ids] @ q))[:k]]
+    return found
+
+
+def latency_ms(index, corpus: np.ndarray, queries: np.ndarray, k: int, rerank: int = 0):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        search(index, corpus, q.reshape(1, -1), k, rerank)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def configurations(args):
+    for encoding in args.encodings:
+        if "flat" in args.index_types:
+            yield "flat", build_params("flat", encoding), [{}]
+        if "hnsw" in args.index_types:
+            yield "hnsw", build_params("hnsw", encoding, m=args.hnsw_m, ef_construction=args.ef_construction, pq_m=args.pq_m), \
+                [{"ef_search": ef, "nprobe": 0} for ef in args.ef_search]
+        if "ivf" in args.index_types:
+            yield "ivf", build_params("ivf", encoding, nlist=args.nlist, pq_m=args.pq_m), \
+                [{"ef_search": 0, "nprobe": p} for p in args.nprobe]
+
+
+def benchmark_size(n: int, args):
+    corpus, queries = synthetic_corpus(n, args.queries, args.dim)
+    ids = np.arange(n, dtype=np.int64)
+
+    start = time.perf_counter()
+    exact = make_index(corpus, ids, build_params("flat", "float32"))
+    exact_build_s = time.perf_counter() - start
+    exact_mb = index_bytes(exact) / (1024 * 1024)
+    _, truth = exact.search(queries, args.k)
+
+    # Re-ranking reads the float32 store (memory-mapped in rag_engine), which is not counted in MB
+    rerank_modes = [0] + ([args.rerank] if args.rerank else [])
+    print(f"\n📚 {n} documents, {args.queries} queries, k={args.k}, float32 flat index {exact_mb:.1f} MB")
+    print(f"{'index':<14}{'search':<14}{'rerank':>8}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'build s':>10}{'MB':>10}{'saved':>8}")
+    for name, params, search_settings in configurations(args):
+        if name == "flat" and params["encoding"] == "float32":
+            index, build_s = exact, exact_build_s
+        else:
+            start = time.perf_counter()
+            index = make_index(corpus, ids, params)
+            build_s = time.perf_counter() - start
+        kind = index_kind(index)
+        if kind.split("-")[0] != name or (params["encoding"] == "pq") != kind.endswith("-pq"):
+            print(f"{name + '/' + params['encoding']:<14}skipped: corpus too small, built {kind}")
+            continue
+        size_mb = index_bytes(index) / (1024 * 1024)
+
+        for settings in search_settings:
+            if settings:
+                set_search_params(index, settings)
+            label = ", ".join(f"{key}={value}" for key, value in settings.items() if value) or "exhaustive"
+            for rerank in rerank_modes:
+                found = search(index, corpus, queries, args.k, rerank)
+                p50, p99 = latency_ms(index, corpus, queries[:args.latency_queries], args.k, rerank)
+                print(f"{name + '/' + params['encoding']:<14}{label:<14}{rerank or '-':>8}"
+                      f"{recall_at_k(found, truth):>10.3f}{p50:>10.3f}{p99:>10.3f}{build_s:>10.1f}{size_mb:>10.1f}"
+                      f"{1 - size_mb / exact_mb:>8.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall, latency, build time and size of RAG index types and vector encodings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384, help="embedding size (384 for the MiniLM encoders)")
+    parser.add_argument("--latency-queries", type=int, default=200, help="queries timed one at a time")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index-types", nargs="+", choices=["flat", "hnsw", "ivf"], default=["flat", "hnsw", "ivf"])
+    parser.add_argument("--encodings", nargs="+", choices=["float32", "fp16", "sq8", "pq"],
+                        default=["float32", "fp16", "sq8", "pq"])
+    parser.add_argument("--rerank", type=int, default=50, help="also report exact re-ranking of this many candidates (0: off)")
+    parser.add_argument("--pq-m", type=int, default=0, help="PQ sub-quantizers; 0 picks one per 8 dimensions")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 128])
+    parser.add_argument("--nlist", type=int, default=0, help="0 picks ~4*sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads; 1 matches one request per worker")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    for n in args.sizes:
+        benchmark_size(n, args)
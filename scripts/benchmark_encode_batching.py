@@ -0,0 +1,48 @@
+# scripts/benchmark_encode_batching.py
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_registry import get_encoder, MULTILINGUAL_MODEL
+from app.utils.encode_batcher import BatchingEncoder
+
+DATA_PATH = "data/rag_data.json"
+
+
+def run(encoder, texts, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(encoder.encode, texts))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def benchmark(threads: int, window_ms: float, max_batch: int, repeat: int):
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        texts = [entry["content"] for entry in json.load(f)] * repeat
+
+    raw = get_encoder(MULTILINGUAL_MODEL, batched=False)
+    raw.encode(texts[:8])  # warm-up
+    batcher = BatchingEncoder(raw, window_ms=window_ms, max_batch=max_batch)
+
+    unbatched = run(raw, texts, threads)
+    batched = run(batcher, texts, threads)
+    print(f"🧵 {threads} threads, {len(texts)} single-text requests")
+    print(f"⏱️ unbatched: {unbatched:.1f} texts/s")
+    print(f"⏱️ batched ({window_ms} ms window): {batched:.1f} texts/s, {batcher.stats()}")
+    print(f"📈 speed-up: {batched / unbatched:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare concurrent single-text encoding with and without micro-batching.")
+    parser.add_argument("--threads", type=int, default=12)
+    parser.add_argument("--window-ms", type=float, default=3.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    benchmark(args.threads, args.window_ms, args.max_batch, args.repeat)
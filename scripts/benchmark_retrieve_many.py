@@ -0,0 +1,71 @@
+# scripts/benchmark_retrieve_many.py
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import rag_engine
+from app.utils.embedding_cache import embedding_cache, cached_encode
+
+DATA_PATH = "data/rag_data.json"
+
+
+def load_queries(count: int, with_filters: bool):
+    """Titles of the RAG entries as queries in their own domain, optionally filtered on their location."""
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    entries = [entries[i % len(entries)] for i in range(count)]
+    queries = [entry.get("title") or entry["content"] for entry in entries]
+    domains = [entry.get("domain") or "general" for entry in entries]
+    filters = [{"location": entry.get("location")} if with_filters else None for entry in entries]
+    return queries, domains, filters
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def benchmark(count: int, with_filters: bool, batch_size: int):
+    queries, domains, filters = load_queries(count, with_filters)
+    vectors = cached_encode(queries, rag_engine.RAG_ENCODER_MODEL)
+    # Measure the searches themselves, not repeated queries answered from the result cache
+    rag_engine.retrieval_cache.max_entries = 0
+
+    def looped(with_vectors: bool):
+        return [rag_engine.retrieve(q, d, "benchmark", v if with_vectors else None, f)
+                for q, d, f, v in zip(queries, domains, filters, vectors)]
+
+    def batched(with_vectors: bool):
+        results = []
+        for i in range(0, count, batch_size):
+            chunk = slice(i, i + batch_size)
+            results += rag_engine.retrieve_many(queries[chunk], domains[chunk], "benchmark",
+                                                vectors[chunk] if with_vectors else None, filters[chunk])
+        return results
+
+    assert looped(True) == batched(True), "retrieve_many() and retrieve() disagree"
+    status = rag_engine.rag_status()
+    print(f"📚 {count} queries, batches of {batch_size}, filters {'on' if with_filters else 'off'}, "
+          f"index {status['version']} ({status['documents']} documents)")
+    for label, with_vectors in (("search only", True), ("encode + search", False)):
+        embedding_cache.clear()
+        loop_s = timed(lambda: looped(with_vectors))
+        embedding_cache.clear()
+        batch_s = timed(lambda: batched(with_vectors))
+        print(f"⏱️ {label:<16} retrieve(): {count / loop_s:>9.1f} q/s   retrieve_many(): {count / batch_s:>9.1f} q/s"
+              f"   📈 {loop_s / batch_s:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare looped retrieve() with batched retrieve_many() on the deployed RAG index.")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--filters", action="store_true", help="filter every query on its entry's location")
+    args = parser.parse_args()
+
+    benchmark(args.queries, args.filters, args.batch_size)
@@ -3,31 +3,275 @@
 import faiss
 import json
 import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import datetime
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_registry import get_encoder, encoder_key
+from app.utils.ann_index import build_params, make_index, index_kind, try_remove_ids
+from app.rag_engine import (RAG_ENCODER_MODEL, INDEX_DIR, INDEX_META_PATH, load_index_meta, domain_key,
+                            version_dir, partition_path, documents_path, vectors_path, vector_ids_path,
+                            read_all_documents)
+from app.utils.document_store import write_documents
+from app.utils.corpus_dedup import deduplicate, TEXT_JACCARD, EMBEDDING_COSINE
 
 DATA_PATH = "data/rag_data.json"
-INDEX_PATH = "model/faiss_index.index"
-DOCS_PATH = "model/documents.json"
+KEEP_VERSIONS = 2  # the live one plus the previous, for workers still reading it
+
+
+def _atomic_write(path: str, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_json(obj, path: str):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+    _atomic_write(path, write)
+
+
+def _read_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def assign_keys(entries):
+    """Tag each entry with the hash of its embedded text and a stable document key.
+
+    Entries with an explicit `id` keep it as their key; otherwise the content hash is
+    the key, so edited content shows up as one removal plus one addition.
+    """
+    seen = {}
+    for entry in entries:
+        digest = hashlib.sha256(entry["content"].encode("utf-8")).hexdigest()[:16]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        entry["content_hash"] = digest
+        entry["doc_key"] = str(entry["id"]) if "id" in entry else f"{digest}:{occurrence}"
+    return entries
+
+
+def load_previous(model_name: str):
+    """Meta, documents, partitions and vector store of the live build, or None when it can't be updated."""
+    meta = load_index_meta()
+    version = meta.get("version")
+    if meta.get("encoder") != encoder_key(model_name) or not version or not os.path.exists(vectors_path(version)):
+        return None
+    partitions = {domain: faiss.read_index(partition_path(version, domain)) for domain in meta["partitions"]}
+    store = (np.load(vector_ids_path(version)), np.load(vectors_path(version)))
+    return meta, read_all_documents(version), partitions, store
+
+
+def build_partitions(entries, ids: np.ndarray, vectors: np.ndarray, params, domains=None):
+    """(Re)build the partitions for `domains` (default: all) from the full-precision store."""
+    rows_by_domain = {}
+    for row, entry in enumerate(entries):
+        rows_by_domain.setdefault(domain_key(entry.get("domain")), []).append(row)
+
+    partitions = {}
+    for domain in sorted(domains if domains is not None else rows_by_domain):
+        rows = rows_by_domain.get(domain)
+        if rows:
+            partitions[domain] = make_index(vectors[rows], ids[rows], params)
+    return partitions
+
+
+def upsert(entries, previous, encode, params):
+    """Bring the partitions in line with `entries`, encoding only new or changed content."""
+    meta, old_docs, partitions, (old_ids, old_vectors) = previous
+    old_rows = {int(vector_id): row for row, vector_id in enumerate(old_ids)}
+    old_by_key = {doc["doc_key"]: doc for doc in old_docs}
+    next_id = meta.get("next_id", 0)
+
+    removals, additions, to_encode = {}, {}, []
+    for entry in entries:
+        old = old_by_key.pop(entry["doc_key"], None)
+        new_domain = domain_key(entry.get("domain"))
+        if old is None:
+            entry["vector_id"] = next_id
+            next_id += 1
+            to_encode.append(entry)
+            additions.setdefault(new_domain, []).append(entry["vector_id"])
+            continue
 
-def build_index():
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        entries = json.load(f)
+        entry["vector_id"] = old["vector_id"]
+        old_domain = domain_key(old.get("domain"))
+        if old["content_hash"] != entry["content_hash"]:
+            removals.setdefault(old_domain, []).append(old["vector_id"])
+            to_encode.append(entry)
+            additions.setdefault(new_domain, []).append(entry["vector_id"])
+        elif old_domain != new_domain:
+            # Same text, new domain: move the stored vector instead of re-encoding it
+            removals.setdefault(old_domain, []).append(old["vector_id"])
+            additions.setdefault(new_domain, []).append(entry["vector_id"])
 
-    texts = [entry["content"] for entry in entries]
-    embeddings = model.encode(texts, convert_to_numpy=True)
+    for old in old_by_key.values():
+        removals.setdefault(domain_key(old.get("domain")), []).append(old["vector_id"])
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(np.array(embeddings).astype("float32"))
+    encoded = dict(zip((entry["vector_id"] for entry in to_encode), encode(to_encode)))
+    ids = np.asarray([entry["vector_id"] for entry in entries], dtype=np.int64)
+    vectors = np.asarray([encoded[i] if i in encoded else old_vectors[old_rows[i]] for i in ids.tolist()],
+                         dtype=np.float32).reshape(len(ids), old_vectors.shape[1])
 
-    faiss.write_index(index, INDEX_PATH)
-    with open(DOCS_PATH, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2, ensure_ascii=False)
+    if meta.get("index") != params:
+        print(f"🔧 Index parameters changed ({meta.get('index')} -> {params}), rebuilding partitions from stored vectors")
+        partitions = build_partitions(entries, ids, vectors, params)
+    else:
+        rows = {vector_id: row for row, vector_id in enumerate(ids.tolist())}
+        rebuild = set()
+        for domain, removed in removals.items():
+            if not try_remove_ids(partitions[domain], removed):
+                rebuild.add(domain)
+        for domain, added in additions.items():
+            if domain in rebuild or domain not in partitions:
+                rebuild.add(domain)
+            else:
+                partitions[domain].add_with_ids(vectors[[rows[i] for i in added]], np.asarray(added, dtype=np.int64))
+        partitions.update(build_partitions(entries, ids, vectors, params, rebuild))
 
-    print(f"✅ Built FAISS index with {len(entries)} documents")
+    print(f"🔁 {len(to_encode)} encoded, {len(entries) - len(to_encode)} reused, {len(old_by_key)} removed")
+    return partitions, (ids, vectors), next_id
+
+
+def build_full(entries, encode, params):
+    for vector_id, entry in enumerate(entries):
+        entry["vector_id"] = vector_id
+    ids = np.arange(len(entries), dtype=np.int64)
+    vectors = encode(entries)
+    print(f"🧱 Full build: {len(entries)} encoded")
+    return build_partitions(entries, ids, vectors, params), (ids, vectors), len(entries)
+
+
+def write_build(entries, partitions, store, next_id: int, model_name: str, params, dedup_stats=None):
+    """Write a new version directory, then switch faiss_index.json to it in one rename."""
+    partitions = {domain: index for domain, index in partitions.items() if index.ntotal}
+    ids, vectors = store
+    version = datetime.datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    os.makedirs(version_dir(version), exist_ok=True)
+
+    for domain, index in partitions.items():
+        faiss.write_index(index, partition_path(version, domain))
+    # Full-precision vectors sorted by id: upserts and index changes never need the encoder,
+    # and rag_engine memory-maps them for exact re-ranking
+    order = np.argsort(ids, kind="stable")
+    np.save(vector_ids_path(version), ids[order])
+    np.save(vectors_path(version), vectors[order])
+    # Documents plus the domain / location / tags postings used for filtered retrieval
+    write_documents(entries, documents_path(version))
+    _write_json({
+        "encoder": encoder_key(model_name),
+        "dim": int(vectors.shape[1]),
+        "metric": "ip",
+        "normalized": True,
+        "layout": "per-domain",
+        "index": params,
+        "store_sorted": True,
+        "postings": True,
+        "version": version,
+        "partitions": {domain: int(index.ntotal) for domain, index in partitions.items()},
+        "partition_types": {domain: index_kind(index) for domain, index in partitions.items()},
+        "documents": len(entries),
+        "next_id": next_id,
+        "dedup": dedup_stats,
+        "built_at": datetime.datetime.now().isoformat(),
+    }, INDEX_META_PATH)
+
+    versions = sorted(name for name in os.listdir(INDEX_DIR) if os.path.isdir(version_dir(name)))
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(version_dir(old), ignore_errors=True)
+
+    sizes = ", ".join(f"{domain}={index.ntotal} {index_kind(index)}" for domain, index in partitions.items())
+    print(f"✅ Wrote FAISS index version {version} ({encoder_key(model_name)}): {sizes}")
+
+
+def report_dedup(stats):
+    removed = stats["entries"] - stats["kept"]
+    print(f"🧹 Dedup: {stats['entries']} -> {stats['kept']} entries ({removed / max(stats['entries'], 1):.1%} smaller); "
+          f"merged {stats['text']} text and {stats['embedding']} embedding near-duplicates, "
+          f"{stats['known']} from earlier builds")
+
+
+def build_index(model_name: str = RAG_ENCODER_MODEL, full: bool = False, migrate: bool = False, params=None,
+                dedup: bool = True, text_threshold: float = TEXT_JACCARD, embedding_threshold: float = EMBEDDING_COSINE,
+                data_path: str = DATA_PATH):
+    params = params or build_params()
+    if migrate:
+        # Re-embed the documents already deployed, so the corpus stays the same
+        meta = load_index_meta()
+        print(f"🔁 Migrating index from {meta.get('encoder')} to {encoder_key(model_name)}")
+        entries = read_all_documents(meta.get("version"))
+    else:
+        entries = _read_json(data_path)
+    entries = assign_keys(entries)
+
+    start = time.perf_counter()
+    previous = None if full or migrate else load_previous(model_name)
+
+    # Vectors by content hash: the deployed store plus anything encoded during this build,
+    # so the dedup pass and the index update never encode the same text twice
+    stored_rows, encoded = {}, {}
+    if previous is not None:
+        _, old_docs, _, (old_ids, old_vectors) = previous
+        old_rows = {int(vector_id): row for row, vector_id in enumerate(old_ids)}
+        stored_rows = {doc["content_hash"]: old_rows[doc["vector_id"]] for doc in old_docs}
+
+    def encode(batch):
+        if not batch:
+            return np.zeros((0, 0), dtype=np.float32)
+        missing = list(dict.fromkeys(entry["content_hash"] for entry in batch
+                                     if entry["content_hash"] not in stored_rows and entry["content_hash"] not in encoded))
+        if missing:
+            texts = {entry["content_hash"]: entry["content"] for entry in batch}
+            model = get_encoder(model_name, batched=False)
+            embeddings = np.asarray(model.encode([texts[h] for h in missing], convert_to_numpy=True,
+                                                 batch_size=64), dtype=np.float32)
+            # Unit vectors: inner product is cosine similarity
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+            encoded.update(zip(missing, embeddings))
+        return np.asarray([encoded[entry["content_hash"]] if entry["content_hash"] in encoded
+                           else old_vectors[stored_rows[entry["content_hash"]]] for entry in batch], dtype=np.float32)
+
+    dedup_stats = None
+    if dedup:
+        known = {h: doc["content_hash"] for doc in previous[1] for h in doc.get("duplicates", [])} if previous else {}
+        entries, dedup_stats = deduplicate(entries, encode, known, text_threshold, embedding_threshold)
+        report_dedup(dedup_stats)
+
+    if previous is None:
+        partitions, store, next_id = build_full(entries, encode, params)
+    else:
+        partitions, store, next_id = upsert(entries, previous, encode, params)
+    print(f"⏱️ Indexed in {time.perf_counter() - start:.1f}s")
+
+    write_build(entries, partitions, store, next_id, model_name, params, dedup_stats)
 
 if __name__ == "__main__":
-    os.makedirs("model", exist_ok=True)
-    build_index()
+    parser = argparse.ArgumentParser(description="Build or incrementally update the per-domain RAG FAISS indexes.")
+    parser.add_argument("--model", default=RAG_ENCODER_MODEL)
+    parser.add_argument("--full", action="store_true", help="re-encode every document instead of upserting changes")
+    parser.add_argument("--migrate", action="store_true",
+                        help=f"re-embed the deployed documents instead of reading {DATA_PATH}")
+    parser.add_argument("--no-dedup", action="store_true", help="index near-duplicate entries as they are")
+    parser.add_argument("--dedup-jaccard", type=float, default=TEXT_JACCARD,
+                        help="MinHash similarity of content at which entries are merged")
+    parser.add_argument("--dedup-cosine", type=float, default=EMBEDDING_COSINE,
+                        help="embedding cosine similarity at which entries are merged")
+    parser.add_argument("--index-type", choices=["flat", "hnsw", "ivf"], help="default: RAG_INDEX_TYPE")
+    parser.add_argument("--encoding", choices=["float32", "fp16", "sq8", "pq"], help="default: RAG_INDEX_ENCODING")
+    parser.add_argument("--pq-m", type=int, dest="pq_m", help="PQ sub-quantizers; 0 picks one per 8 dimensions")
+    parser.add_argument("--hnsw-m", type=int, dest="m")
+    parser.add_argument("--hnsw-ef-construction", type=int, dest="ef_construction")
+    parser.add_argument("--ivf-nlist", type=int, dest="nlist", help="0 picks ~4*sqrt(n) per partition")
+    args = parser.parse_args()
+
+    params = build_params(args.index_type, args.encoding, m=args.m, ef_construction=args.ef_construction,
+                          nlist=args.nlist, pq_m=args.pq_m)
+    build_index(args.model, args.full, args.migrate, params, not args.no_dedup, args.dedup_jaccard, args.dedup_cosine)
@@ -0,0 +1,18 @@
+# scripts/build_phrase_embeddings.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing the orchestrator registers the reset, follow-up, domain and intent phrase segments
+import app.agent_orchestrator  # noqa: F401
+from app.utils.phrase_bank import phrase_bank
+
+
+def build_phrase_embeddings():
+    for path in phrase_bank.save_artifacts():
+        print(f"✅ Wrote {path}")
+
+if __name__ == "__main__":
+    build_phrase_embeddings()
@@ -0,0 +1,103 @@
+# scripts/check_encoder_parity.py
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_registry import get_encoder, MULTILINGUAL_MODEL
+from app.agent_orchestrator import RESET_PHRASES
+from app.utils.context_followup import FOLLOWUP_PHRASES
+from app.utils.domain_detector import DOMAIN_CANDIDATES
+from app.intents.intent_classifier import intent_examples
+
+DATA_PATH = "data/rag_data.json"
+
+
+def load_corpora():
+    phrases = list(RESET_PHRASES) + list(FOLLOWUP_PHRASES)
+    phrases += [p for group in DOMAIN_CANDIDATES.values() for p in group]
+    phrases += [p for group in intent_examples.values() for p in group]
+
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        rag_texts = [entry["content"] for entry in json.load(f)]
+    return {"phrase_banks": phrases, "rag_data": rag_texts}
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+def compare(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    ref, cand = _unit(reference), _unit(candidate)
+    cosine = (ref * cand).sum(axis=1)
+
+    # Does each text keep the same nearest neighbour within its corpus?
+    ref_sim, cand_sim = ref @ ref.T, cand @ cand.T
+    np.fill_diagonal(ref_sim, -np.inf)
+    np.fill_diagonal(cand_sim, -np.inf)
+    nn_agreement = float((ref_sim.argmax(axis=1) == cand_sim.argmax(axis=1)).mean())
+
+    return {
+        "texts": len(cosine),
+        "cosine_mean": round(float(cosine.mean()), 4),
+        "cosine_p01": round(float(np.percentile(cosine, 1)), 4),
+        "cosine_min": round(float(cosine.min()), 4),
+        "nearest_neighbour_agreement": round(nn_agreement, 4),
+    }
+
+
+def measure_latency(encoder, texts, batch_size: int = 32) -> dict:
+    encoder.encode(texts[:batch_size])  # warm-up
+
+    single = []
+    for text in texts[:200]:
+        start = time.perf_counter()
+        encoder.encode([text])
+        single.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    encoder.encode(texts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "single_p50_ms": round(float(np.percentile(single, 50)), 2),
+        "single_p99_ms": round(float(np.percentile(single, 99)), 2),
+        "batch_texts_per_s": round(len(texts) / batch_seconds, 1),
+    }
+
+
+def check_parity(model_name: str, backend: str, min_mean_cosine: float) -> bool:
+    reference = get_encoder(model_name, backend="torch", batched=False)
+    candidate = get_encoder(model_name, backend=backend, batched=False)
+
+    ok = True
+    corpora = load_corpora()
+    for name, texts in corpora.items():
+        stats = compare(
+            np.asarray(reference.encode(texts, convert_to_numpy=True)),
+            np.asarray(candidate.encode(texts, convert_to_numpy=True)),
+        )
+        print(f"📐 {name}: {stats}")
+        ok = ok and stats["cosine_mean"] >= min_mean_cosine
+
+    all_texts = [t for texts in corpora.values() for t in texts]
+    print(f"⏱️ torch: {measure_latency(reference, all_texts)}")
+    print(f"⏱️ {backend}: {measure_latency(candidate, all_texts)}")
+
+    print("✅ Parity OK" if ok else f"❌ Mean cosine below {min_mean_cosine}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare an alternative encoder backend against PyTorch.")
+    parser.add_argument("--model", default=MULTILINGUAL_MODEL)
+    parser.add_argument("--backend", default="onnx", help="onnx (int8) or onnx-fp32")
+    parser.add_argument("--min-mean-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    sys.exit(0 if check_parity(args.model, args.backend, args.min_mean_cosine) else 1)
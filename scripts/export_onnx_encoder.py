@@ -0,0 +1,79 @@
+# scripts/export_onnx_encoder.py
+
+import os
+import sys
+import json
+import argparse
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_registry import get_encoder, MULTILINGUAL_MODEL, ENGLISH_MODEL
+from app.utils.onnx_encoder import onnx_model_dir, CONFIG_FILE, FP32_FILE, INT8_FILE
+
+
+class _HiddenStates(torch.nn.Module):
+    def __init__(self, transformer):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, input_ids, attention_mask):
+        return self.transformer(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+
+def export_encoder(model_name: str, quantize: bool = True):
+    st_model = get_encoder(model_name, backend="torch", batched=False)
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    pooling = st_model[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError(f"{model_name} does not use mean pooling; the ONNX encoder only supports mean pooling")
+    normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+
+    out_dir = onnx_model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+
+    dummy = tokenizer(["LocalLoop export", "pesan nasi goreng"], padding=True, return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenStates(transformer),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+    print(f"✅ Exported {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        int8_path = os.path.join(out_dir, INT8_FILE)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized {int8_path}")
+
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "pooling": "mean",
+            "normalize": normalize,
+        }, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a SentenceTransformer encoder to ONNX (optionally int8).")
+    parser.add_argument("--model", action="append", help="Model name; repeatable. Defaults to both MiniLM encoders.")
+    parser.add_argument("--no-quantize", action="store_true", help="Only write the fp32 ONNX graph")
+    args = parser.parse_args()
+
+    for name in args.model or [MULTILINGUAL_MODEL, ENGLISH_MODEL]:
+        export_encoder(name, quantize=not args.no_quantize)
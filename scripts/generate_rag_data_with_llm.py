@@ -1,16 +1,61 @@
 import os
+import sys
 import json
+import time
+import argparse
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 SERP_API_KEY = os.getenv("SERP_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-client = OpenAI(
-    api_key=os.getenv("GROG_API_KEY"),
-    base_url="https://api.groq.com/openai/v1"
-)
 MODEL_NAME = "llama3-8b-8192"
 
+QUERIES_PATH = "data/queries.json"
+OUTPUT_PATH = "data/rag_data.json"
+JOURNAL_PATH = "data/rag_journal.jsonl"  # one line per finished query, so a re-run resumes
+
+# Calls per second allowed for each provider, shared by all workers
+RATE_LIMITS = {
+    "serp": float(os.getenv("SERP_RATE_LIMIT", "2")),
+    "tavily": float(os.getenv("TAVILY_RATE_LIMIT", "2")),
+    "llm": float(os.getenv("LLM_RATE_LIMIT", "0.5")),
+}
+RETRIES = 2
+
+_client = None
+
+
+def llm_client() -> OpenAI:
+    # Created on first use, so offline runs need no API key
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv("GROG_API_KEY"), base_url="https://api.groq.com/openai/v1")
+    return _client
+
+
+class RateLimiter:
+    """Spaces calls to one provider at most `rate` per second across threads (0: unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+limiters = {name: RateLimiter(rate) for name, rate in RATE_LIMITS.items()}
+
+
 def call_serp_api(query, num=5):
     url = "https://serpapi.com/search"
     params = {
@@ -20,14 +65,14 @@ def call_serp_api(query, num=5):
         "num": num,
         "api_key": SERP_API_KEY
     }
-    res = requests.get(url, params=params)
+    res = requests.get(url, params=params, timeout=30)
     return res.json().get("organic_results", [])
 
 def extract_rag_items_with_llm(serp_results, query, domain):
     serp_texts = [r.get("title", "") + ": " + r.get("snippet", "") for r in serp_results if r.get("snippet")]
 
     system = f"""
-You are an assistant that extracts structured RAG (retrieval-augmented generation) entries from web search results. 
+You are an assistant that extracts structured RAG (retrieval-augmented generation) entries from web search results.
 Given a list of web snippets and a user intent ("{query}"), extract relevant items for the domain: {domain}.
 Each item must contain: domain, title, description, location, and list of tags.
 """
@@ -60,7 +105,7 @@ Each item must contain: domain, title, description, location, and list of tags.
         }
     }
 
-    response = client.chat.completions.create(
+    response = llm_client().chat.completions.create(
         model=MODEL_NAME,
         messages=[
             {"role": "system", "content": system},
@@ -74,61 +119,177 @@ Each item must contain: domain, title, description, location, and list of tags.
     result = response.choices[0].message.function_call.arguments
     return json.loads(result)["items"]
 
-def load_queries(path="data/queries.json"):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def call_tavily_api(query, num=5):
+    url = "https://api.tavily.com/search"
+    headers = {"Authorization": f"Bearer {TAVILY_API_KEY}"}
+    payload = {
+        "query": query,
+        "search_depth": "advanced",
+        "include_answer": False,
+        "include_raw_content": True
+    }
+    res = requests.post(url, json=payload, headers=headers, timeout=30)
+    results = res.json().get("results", [])
+    return [{"title": r["title"], "snippet": r.get("content", "")} for r in results][:num]
 
-def generate_rag_data():
-    queries = load_queries()
-    all_items = []
+# ------------------ Offline stand-ins ------------------
 
-    for domain, query_list in queries.items():
-        for query in query_list:
-            print(f"🔍 Searching: {query}")
-            serp = call_serp_api(query)
+OFFLINE_FIXTURES = {}  # query -> recorded search results, from --fixtures
 
-            # Optional fallback: use Tavily if SERP empty
-            if not serp:
-                print("⚠️ No SERP results, trying Tavily...")
-                serp = call_tavily_api(query)  
 
-            if not serp:
-                print(f"⚠️ Skipping: no results from any provider.")
-                continue
+def offline_search(query, num=5):
+    """Recorded results for `query` from --fixtures, else deterministic snippets made from the query."""
+    if query in OFFLINE_FIXTURES:
+        return OFFLINE_FIXTURES[query][:num]
+    return [{"title": f"{query.title()} #{i + 1}", "snippet": f"Pilihan {query} nomor {i + 1}"} for i in range(min(num, 3))]
 
-            try:
-                items = extract_rag_items_with_llm(serp, query, domain)
-                all_items.extend(items)
-                print(f"✅ Parsed {len(items)} items from {query}")
-            except Exception as e:
-                print(f"❌ Error parsing {query}: {e}")
+def offline_extract(serp_results, query, domain):
+    """One item per search result, with the location and tags taken from the query."""
+    location = query.rsplit(" di ", 1)[-1] if " di " in query else query.split()[-1]
+    return [{
+        "domain": domain,
+        "title": r.get("title", ""),
+        "description": r.get("snippet", ""),
+        "location": location.title(),
+        "tags": query.lower().split(),
+    } for r in serp_results if r.get("snippet")]
 
+SEARCH_PROVIDERS = {"serp": call_serp_api, "tavily": call_tavily_api, "offline": offline_search}
+EXTRACTORS = {"llm": extract_rag_items_with_llm, "offline": offline_extract}
 
-    for item in all_items:
-        item["content"] = f"{item['title']} - {item['description']} (Location: {item['location']})"
+# ------------------ Pipeline ------------------
 
-    os.makedirs("data", exist_ok=True)
-    with open("data/rag_data.json", "w", encoding="utf-8") as f:
-        json.dump(all_items, f, indent=2, ensure_ascii=False)
+def _call(provider: str, fn, *args):
+    """Call `fn` within the provider's rate limit, retrying with backoff."""
+    for attempt in range(RETRIES + 1):
+        if provider in limiters:
+            limiters[provider].wait()
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == RETRIES:
+                raise
+            print(f"⚠️ {provider} failed ({e}), retrying...")
+            time.sleep(2 ** attempt)
 
-    print(f"\n📦 Saved {len(all_items)} RAG items to data/rag_data.json")
 
-def call_tavily_api(query, num=5):
-    url = "https://api.tavily.com/search"
-    headers = {"Authorization": f"Bearer {TAVILY_API_KEY}"}
-    payload = {
-        "query": query,
-        "search_depth": "advanced",
-        "include_answer": False,
-        "include_raw_content": True
-    }
+def process_query(domain, query, search: str, fallback: str, extractor: str) -> dict:
+    record = {"domain": domain, "query": query, "items": []}
     try:
-        res = requests.post(url, json=payload, headers=headers)
-        results = res.json().get("results", [])
-        return [{"title": r["title"], "snippet": r.get("content", "")} for r in results][:num]
+        print(f"🔍 Searching: {query}")
+        serp = _call(search, SEARCH_PROVIDERS[search], query)
+        if not serp and fallback:
+            print(f"⚠️ No {search} results for {query}, trying {fallback}...")
+            serp = _call(fallback, SEARCH_PROVIDERS[fallback], query)
+        if not serp:
+            print(f"⚠️ Skipping {query}: no results from any provider.")
+            return dict(record, status="empty")
+
+        items = _call(extractor, EXTRACTORS[extractor], serp, query, domain)
+        for item in items:
+            item["domain"] = item.get("domain") or domain
+            item["content"] = f"{item['title']} - {item['description']} (Location: {item['location']})"
+        print(f"✅ Parsed {len(items)} items from {query}")
+        return dict(record, status="ok", items=items)
     except Exception as e:
-        print("❌ Tavily error:", e)
-        return []
-    
+        print(f"❌ Error processing {query}: {e}")
+        return dict(record, status="error", error=str(e))
+
+
+class Journal:
+    """Append-only JSONL of finished queries; each line is flushed to disk before the next."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def records(self) -> dict:
+        """Latest record per (domain, query); a line cut off by a crash is ignored."""
+        latest = {}
+        if not os.path.exists(self.path):
+            return latest
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                latest[(record["domain"], record["query"])] = record
+        return latest
+
+    def append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def items(self) -> list:
+        return [item for record in self.records().values() if record["status"] == "ok" for item in record["items"]]
+
+
+def load_queries(path=QUERIES_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def publish(journal: Journal, output_path: str, build: bool):
+    """Write every journaled item to `output_path`, then optionally update the index incrementally."""
+    items = journal.items()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+    print(f"\n📦 Saved {len(items)} RAG items to {output_path}")
+
+    if build:
+        from scripts.build_faiss_index import build_index
+        build_index(data_path=output_path)
+
+def generate_rag_data(queries_path=QUERIES_PATH, output_path=OUTPUT_PATH, journal_path=JOURNAL_PATH,
+                      workers=4, search="serp", fallback="tavily", extractor="llm",
+                      build=False, index_every=0):
+    journal = Journal(journal_path)
+    # Queries that failed are retried; ones with results, or with none to find, are not
+    finished = {key for key, record in journal.records().items() if record["status"] != "error"}
+    jobs = [(domain, query) for domain, query_list in load_queries(queries_path).items() for query in query_list]
+    pending = [job for job in jobs if job not in finished]
+    print(f"🧾 {len(jobs) - len(pending)} of {len(jobs)} queries already in {journal_path}, {len(pending)} to run")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_query, domain, query, search, fallback, extractor) for domain, query in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            journal.append(future.result())
+            if index_every and done % index_every == 0 and done < len(pending):
+                # Stream what we have into the index while the remaining queries run
+                publish(journal, output_path, build=True)
+
+    publish(journal, output_path, build or bool(index_every))
+
 if __name__ == "__main__":
-    generate_rag_data()
+    parser = argparse.ArgumentParser(description="Generate RAG entries from web search results, in parallel and resumably.")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="JSONL checkpoint; finished queries are skipped on re-run")
+    parser.add_argument("--fresh", action="store_true", help="discard the journal and start over")
+    parser.add_argument("--workers", type=int, default=4, help="queries processed concurrently")
+    parser.add_argument("--search", choices=sorted(SEARCH_PROVIDERS), default="serp")
+    parser.add_argument("--fallback", choices=sorted(SEARCH_PROVIDERS) + ["none"], default="tavily",
+                        help="search provider tried when the first returns nothing")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default="llm")
+    parser.add_argument("--fixtures", help="JSON of query -> recorded search results for --search offline")
+    parser.add_argument("--build-index", action="store_true", help="update the FAISS index incrementally at the end")
+    parser.add_argument("--index-every", type=int, default=0,
+                        help="also update the index every N finished queries (0: only with --build-index)")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        with open(args.fixtures, "r", encoding="utf-8") as f:
+            OFFLINE_FIXTURES.update(json.load(f))
+    if args.fresh and os.path.exists(args.journal):
+        os.remove(args.journal)
+
+    generate_rag_data(args.queries, args.output, args.journal, args.workers, args.search,
+                      None if args.fallback == "none" else args.fallback, args.extractor,
+                      args.build_index, args.index_every)
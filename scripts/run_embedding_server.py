@@ -0,0 +1,20 @@
+# scripts/run_embedding_server.py
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_registry import MULTILINGUAL_MODEL
+from app.utils.embedding_server import serve
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the sentence encoders to every app worker on this host.")
+    parser.add_argument("--url", default=os.getenv("EMBEDDING_SERVER_URL") or "unix:///tmp/localloop-embed.sock",
+                        help="unix:///path/to.sock or http://127.0.0.1:PORT")
+    parser.add_argument("--preload", nargs="*", default=[MULTILINGUAL_MODEL, os.getenv("RAG_ENCODER_MODEL", MULTILINGUAL_MODEL)],
+                        help="models to load before accepting requests")
+    args = parser.parse_args()
+
+    serve(args.url, dict.fromkeys(args.preload))
@@ -0,0 +1,167 @@
+# scripts/train_intent_head.py
+
+import os
+import sys
+import json
+import argparse
+import datetime
+
+import joblib
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score
+from sklearn.pipeline import make_pipeline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.model_registry import encoder_key, MULTILINGUAL_MODEL
+from app.utils.embedding_cache import cached_encode
+from app.utils.domain_detector import DOMAIN_CANDIDATES
+from app.intents.intent_classifier import intent_examples, intent_domains
+from app.intents.intent_head import INTENT_HEAD_PATH
+from app.intents.lexical_classifier import LEXICAL_MODEL_PATH, NO_INTENT
+from app.agent_orchestrator import RESET_PHRASES
+from app.utils.context_followup import FOLLOWUP_PHRASES
+
+CALIBRATION_FOLDS = 3
+
+
+def load_traffic(path: str):
+    rows = []
+    if not path or not os.path.exists(path):
+        return rows
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def build_datasets(traffic, include_unverified: bool = False):
+    intent_texts, intent_labels = [], []
+    for intent, examples in intent_examples.items():
+        intent_texts += examples
+        intent_labels += [intent] * len(examples)
+
+    domain_texts, domain_labels = [], []
+    for domain, phrases in DOMAIN_CANDIDATES.items():
+        domain_texts += phrases
+        domain_labels += [domain] * len(phrases)
+    domain_texts += intent_texts
+    domain_labels += [intent_domains[intent] for intent in intent_labels]
+
+    skipped = 0
+    for row in traffic:
+        text = row.get("text", "").strip()
+        if not text:
+            continue
+        # Unverified rows carry the classifier's own prediction as their label
+        if not row.get("verified") and not include_unverified:
+            skipped += 1
+            continue
+        if row.get("intent"):
+            intent_texts.append(text)
+            intent_labels.append(row["intent"])
+        domain = intent_domains.get(row.get("intent")) or row.get("domain")
+        if domain:
+            domain_texts.append(text)
+            domain_labels.append(domain)
+    if skipped:
+        print(f"⚠️ Skipped {skipped} unverified traffic rows (use --include-unverified to train on them)")
+
+    return (intent_texts, intent_labels), (domain_texts, domain_labels)
+
+
+def _drop_rare(texts, labels, minimum: int):
+    counts = {label: labels.count(label) for label in set(labels)}
+    keep = [i for i, label in enumerate(labels) if counts[label] >= minimum]
+    dropped = sorted(label for label, n in counts.items() if n < minimum)
+    if dropped:
+        print(f"⚠️ Skipping labels with fewer than {minimum} examples: {dropped}")
+    return [texts[i] for i in keep], [labels[i] for i in keep]
+
+
+def _embed(texts):
+    # The same path TurnAnalysis.embedding takes at serving time
+    vectors = np.asarray(cached_encode(texts, MULTILINGUAL_MODEL), dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def _make_classifier(kind: str):
+    if kind == "lightgbm":
+        from lightgbm import LGBMClassifier
+
+        base = LGBMClassifier(n_estimators=200, learning_rate=0.05, num_leaves=15, min_child_samples=3, verbose=-1)
+    else:
+        base = LogisticRegression(C=4.0, max_iter=2000)
+    return CalibratedClassifierCV(base, cv=CALIBRATION_FOLDS, method="sigmoid")
+
+
+def fit_head(name: str, texts, labels, kind: str):
+    texts, labels = _drop_rare(texts, labels, CALIBRATION_FOLDS * 2)
+    X, y = _embed(texts), np.array(labels)
+
+    accuracy = cross_val_score(_make_classifier(kind), X, y, cv=CALIBRATION_FOLDS).mean()
+    print(f"📊 {name}: {len(texts)} examples, {len(set(labels))} labels, cv accuracy {accuracy:.3f}")
+    return _make_classifier(kind).fit(X, y)
+
+
+def _make_lexical_classifier():
+    return make_pipeline(
+        HashingVectorizer(analyzer="char_wb", ngram_range=(2, 5), n_features=2 ** 18, alternate_sign=False),
+        CalibratedClassifierCV(LogisticRegression(C=10.0, max_iter=2000), cv=CALIBRATION_FOLDS, method="sigmoid"),
+    )
+
+
+def fit_lexical(name: str, texts, labels):
+    texts, labels = _drop_rare([t.lower() for t in texts], labels, CALIBRATION_FOLDS * 2)
+    accuracy = cross_val_score(_make_lexical_classifier(), texts, labels, cv=CALIBRATION_FOLDS).mean()
+    print(f"📊 lexical {name}: {len(texts)} examples, cv accuracy {accuracy:.3f}")
+    return _make_lexical_classifier().fit(texts, labels)
+
+
+def _dump(obj, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train(kind: str, traffic_path: str, out_path: str, lexical_path: str, include_unverified: bool = False):
+    (intent_texts, intent_labels), (domain_texts, domain_labels) = build_datasets(load_traffic(traffic_path),
+                                                                                  include_unverified)
+
+    # Without a rejection class every out-of-scope message would get some confident intent
+    out_of_scope = DOMAIN_CANDIDATES["general"] + RESET_PHRASES + FOLLOWUP_PHRASES
+    _dump({
+        "intent": fit_lexical("intent", intent_texts + out_of_scope, intent_labels + [NO_INTENT] * len(out_of_scope)),
+        "domain": fit_lexical("domain", domain_texts, domain_labels),
+    }, lexical_path)
+    print(f"✅ Saved lexical first-stage classifier to {lexical_path}")
+
+    head = {
+        "encoder": encoder_key(MULTILINGUAL_MODEL),
+        "kind": kind,
+        "trained_at": datetime.datetime.now().isoformat(),
+        "intent": fit_head("intent", intent_texts, intent_labels, kind),
+        "domain": fit_head("domain", domain_texts, domain_labels, kind),
+    }
+
+    _dump(head, out_path)
+    print(f"✅ Saved {kind} intent/domain head to {out_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the lexical first stage and the embedding head for intent/domain.")
+    parser.add_argument("--kind", choices=["logreg", "lightgbm"], default="logreg")
+    parser.add_argument("--traffic", default=os.getenv("INTENT_TRAFFIC_LOG", ""),
+                        help="JSONL of logged turns with text and intent/domain labels")
+    parser.add_argument("--include-unverified", action="store_true",
+                        help="also train on logged turns labelled only by the classifier's own prediction")
+    parser.add_argument("--out", default=INTENT_HEAD_PATH)
+    parser.add_argument("--lexical-out", default=LEXICAL_MODEL_PATH)
+    args = parser.parse_args()
+
+    train(args.kind, args.traffic, args.out, args.lexical_out, args.include_unverified)